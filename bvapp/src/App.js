@@ -60,6 +60,10 @@ const timePeriods = [
   "All time",
 ];
 
+// Compact responses embed charts as objects; the default mode sends JSON strings
+const parseChart = (chart) =>
+  typeof chart === "string" ? JSON.parse(chart) : chart;
+
 function App() {
   const [industry, setIndustry] = useState("");
   const [company, setCompany] = useState("");
@@ -135,17 +139,15 @@ function App() {
 
     setLoading(true);
     try {
-      const response = await fetch("/api/stock-data", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          industry,
-          company,
-          time_period: timePeriod,
-        }),
+      // A GET, so the browser revalidates repeat visits with the ETag
+      const params = new URLSearchParams({
+        industry,
+        company,
+        time_period: timePeriod,
+        compact: "1",
+        max_points: "1000",
       });
+      const response = await fetch(`/api/stock-data?${params}`);
 
       if (!response.ok) {
         throw new Error("Error fetching stock data");
@@ -154,10 +156,10 @@ function App() {
       const data = await response.json();
 
       setStockData(data);
-      setCompanyPlot(JSON.parse(data["monetary_plot"]));
-      setForecastPlot(JSON.parse(data["forecast_plot"]));
-      setIndustryPEPlot(JSON.parse(data["industry_plot"]));
-      setStockDataPlot(JSON.parse(data["plot"]));
+      setCompanyPlot(parseChart(data["monetary_plot"]));
+      setForecastPlot(parseChart(data["forecast_plot"]));
+      setIndustryPEPlot(parseChart(data["industry_plot"]));
+      setStockDataPlot(parseChart(data["plot"]));
 
       const newsResponse = await fetch("/api/news", {
         method: "POST",
@@ -1,29 +1,128 @@
-from sklearn.preprocessing import MinMaxScaler
-from flask import Flask, jsonify, request
-from keras.models import load_model
-from pmdarima import auto_arima
-import statsmodels.api as sm
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import plotly as plotly
-from plotly.subplots import make_subplots
-import requests
+from flask import Flask, jsonify, request, stream_with_context
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as SectionTimeout
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import json
-import re
+import hashlib
+import os
+import threading
+import time
+import requests
+
+from chart_cache import ChartCache
+from charts import chart_payload
+from compression import compress_response
+from constituents import ConstituentTable
+from dcf import (
+    ValuationError,
+    base_discount_rate,
+    dcf_values,
+    discount_rates,
+    sensitivity_grid,
+    stack_inputs,
+    valuation_inputs,
+)
+from downsample import downsample
+from logos import LogoCache
+from monte_carlo import estimate_beta, fit_distributions, simulate, summarize
+from news import NewsCache, NewsUnavailable
+from forecast_jobs import ForecastJobs, QueueFull
+from forecasting import ARIMA_END, ARIMA_START, N_PERIODS, arima_forecast, batch_forecasts
+from predictor import MicroBatcher, prediction_window
+from price_store import get_store
+from sector_fundamentals import SectorFundamentals
+from snapshot import TickerSnapshot
+from ticker_index import TickerIndex, search_ticker, yahoo_symbol
 
 
 app = Flask(__name__)
 
 
-# Load the JSON data from the file
-with open("./sp500_tickers.json", "r") as file:
-    sp500Json = json.load(file)
+# S&P 500 constituents, from the last refreshed copy or the shipped
+# sp500_tickers.json, re-scraped from Wikipedia in the background
+constituents = ConstituentTable()
+sp500Json = constituents.data
+
+# Company name / symbol -> ticker lookup for the valuation endpoint
+ticker_index = TickerIndex(sp500Json)
+
+# Sector -> constituents index and the peer P/E / market cap table behind the
+# industry chart, refreshed in the background
+sector_fundamentals = SectorFundamentals(sp500Json)
+
+
+def apply_constituents(data):
+    # Rebuild everything derived from the constituents when they change
+    global sp500Json, ticker_index
+    sp500Json = data
+    ticker_index = TickerIndex(data)
+    sector_fundamentals.set_constituents(data)
 
-# Load the stock price prediction model
-model = load_model("combined_sp500_lstm_model.h5")
+
+constituents.on_change.append(apply_constituents)
+
+# ARIMA fits submitted through /api/forecast-jobs run in a separate process pool
+forecast_jobs = ForecastJobs()
+
+# The stock price prediction model is loaded on a background thread so that
+# importing the app (and every endpoint that doesn't need it) stays fast
+MODEL_PATH = "combined_sp500_lstm_model.h5"
+NUMPY_MODEL_PATH = "combined_sp500_lstm_model.npz"
+MODEL_WAIT_SECONDS = float(os.environ.get("BV_MODEL_WAIT_SECONDS", 60))
+# How long /api/predict-price waits for its batch, model loading included,
+# and how many tickers one request may ask for
+PREDICT_TIMEOUT = float(os.environ.get("BV_PREDICT_TIMEOUT", MODEL_WAIT_SECONDS + 30))
+MAX_PREDICT_TICKERS = int(os.environ.get("BV_MAX_PREDICT_TICKERS", 50))
+
+# "numpy" serves the model with the NumPy forward pass in numpy_lstm.py (no
+# TensorFlow in the web process); "keras" loads the H5 file with Keras
+LSTM_RUNTIME = os.environ.get("BV_LSTM_RUNTIME", "numpy")
+
+model_ready = threading.Event()
+model_state = {"model": None, "error": None, "load_seconds": None}
+_model_thread = None
+
+
+def load_prediction_model():
+    started = time.perf_counter()
+    try:
+        if LSTM_RUNTIME == "keras":
+            from keras.models import load_model
+
+            model_state["model"] = load_model(MODEL_PATH)
+        else:
+            from numpy_lstm import load_numpy_model
+
+            model_state["model"] = load_numpy_model(MODEL_PATH, NUMPY_MODEL_PATH)
+    except Exception as e:
+        print(f"Could not load {MODEL_PATH}: {e}")
+        model_state["error"] = str(e)
+    model_state["load_seconds"] = time.perf_counter() - started
+    model_ready.set()
+
+
+def start_model_warmup():
+    global _model_thread
+    if _model_thread is None and not model_ready.is_set():
+        _model_thread = threading.Thread(target=load_prediction_model, name="model-warmup", daemon=True)
+        _model_thread.start()
+
+
+def get_model(timeout=MODEL_WAIT_SECONDS):
+    start_model_warmup()
+    if not model_ready.wait(timeout):
+        raise RuntimeError("Prediction model is still loading.")
+    if model_state["error"] is not None:
+        raise RuntimeError(f"Prediction model failed to load: {model_state['error']}")
+    return model_state["model"]
+
+
+if os.environ.get("BV_MODEL_WARMUP", "1") != "0":
+    start_model_warmup()
+
+# Concurrent price predictions are merged into shared model.predict calls
+prediction_batcher = MicroBatcher(lambda X: get_model().predict(X, verbose=0))
 
 valid_time_periods = {
     "1 day": "1d",
@@ -39,87 +138,389 @@ valid_time_periods = {
     "All time": "max",
 }
 
+# The /api/stock-data sections are independent and mostly wait on the network,
+# so they run side by side on a bounded pool shared by all requests
+SECTION_WORKERS = int(os.environ.get("BV_SECTION_WORKERS", 12))
+SECTION_TIMEOUT = float(os.environ.get("BV_SECTION_TIMEOUT", 30))
+
+# Sections that are expected to take longer than the default timeout
+section_timeouts = {
+    "forecast_plot": float(os.environ.get("BV_FORECAST_TIMEOUT", 120)),
+    "industry_plot": float(os.environ.get("BV_INDUSTRY_TIMEOUT", 60)),
+}
+
+# How long browsers may reuse /api/sp500_tickers before revalidating it
+CONSTITUENTS_MAX_AGE = int(os.environ.get("BV_CONSTITUENTS_MAX_AGE", 300))
+
+# Upper bound on the paths one Monte Carlo valuation request may ask for
+MAX_SIMULATION_PATHS = int(os.environ.get("BV_MAX_SIMULATION_PATHS", 1_000_000))
+
+section_executor = ThreadPoolExecutor(
+    max_workers=SECTION_WORKERS, thread_name_prefix="section"
+)
+
+# Built section payloads, reused across visitors until their data can change
+chart_cache = ChartCache()
+
+# stocknewsapi headlines and sentiment per ticker
+news_cache = NewsCache()
+
+# Company domain -> Clearbit logo URL, resolved off the request path
+logo_cache = LogoCache()
+
+# Batch valuations (and price predictions) fetch every company's data side by
+# side on their own pool, so a sector request doesn't starve the page sections
+VALUATION_WORKERS = int(os.environ.get("BV_VALUATION_WORKERS", 16))
+VALUATION_TIMEOUT = float(os.environ.get("BV_VALUATION_TIMEOUT", 60))
+MAX_BATCH_TICKERS = int(os.environ.get("BV_MAX_BATCH_TICKERS", 150))
+
+valuation_executor = ThreadPoolExecutor(
+    max_workers=VALUATION_WORKERS, thread_name_prefix="valuation"
+)
+
+
+_background_pid = None
+_background_lock = threading.Lock()
+
+
+@app.before_request
+def start_background_tasks():
+    # Started on the first request of each process (rather than at import) so
+    # that forked workers run their own refresh threads
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid != os.getpid():
+            constituents.start()
+            sector_fundamentals.start()
+            _background_pid = os.getpid()
+
+
+@app.after_request
+def compress(response):
+    # gzip / brotli for clients that accept it; streamed responses pass through
+    return compress_response(response, request.headers.get("Accept-Encoding"))
+
+
+@app.route("/api/ready", methods=["GET"])
+def readiness():
+    if not model_ready.is_set():
+        status = "loading"
+    elif model_state["error"] is not None:
+        status = "failed"
+    else:
+        status = "ready"
+    body = {"ready": status == "ready", "model": status, "model_load_seconds": model_state["load_seconds"]}
+    return jsonify(body), 200 if status == "ready" else 503
+
 
 @app.route("/api/sp500_tickers", methods=["GET"])
 def get_sp500_tickers():
-    url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    tables = pd.read_html(url)
-    df = tables[0]  # The first table contains the S&P 500 data
-    df = df[["Symbol", "GICS Sector", "Security"]]  # Select relevant columns - these are ticker, industry and company name
-    tickers_data = df.set_index("Symbol")[["GICS Sector", "Security"]].to_dict(
-        orient="index"
-    )
-    return jsonify(tickers_data)
+    # Served from memory; the ETag lets browsers revalidate with a 304
+    _, body, etag = constituents.snapshot()
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CONSTITUENTS_MAX_AGE
+    return response.make_conditional(request)
 
 
-@app.route("/api/stock-data", methods=["POST"])
+@app.route("/api/stock-data", methods=["GET", "POST"])
 def get_stock_data():
-    data = request.json
+    # GET takes the same fields as query parameters, so browsers can
+    # revalidate the response with its ETag
+    data = request.json if request.method == "POST" else request.args
+    ticker, company_name, time_period, sections = stock_data_sections(data)
+
+    # In async mode the forecast is handed to the job pool and the client
+    # polls /api/forecast-jobs/<id> for it
+    forecast_job = None
+    if data.get("forecast_mode") == "async":
+        del sections["forecast_plot"]
+        try:
+            forecast_job = job_status(forecast_jobs.submit(ticker))
+        except QueueFull as e:
+            forecast_job = {"status": "rejected", "error": str(e)}
+
+    results, errors = run_sections(sections)
+
+    # Sections come back as cache entries; their ETags make up the response's
+    etags = {}
+    for name, entry in results.items():
+        if entry is not None:
+            results[name] = entry.payload
+            etags[name] = entry.etag
+
+    if results.get("info"):
+        results["info"] = with_logo(results["info"])
+        etags["logo"] = results["info"]["Company Logo"] or ""
+
+    result = {
+        "company": company_name,
+        "ticker_symbol": ticker,
+        **results,
+        "errors": errors,
+    }
+    if forecast_job is not None:
+        result["forecast_plot"] = None
+        result["forecast_job"] = forecast_job
+
+    response = jsonify(result)
+    if not errors and forecast_job is None:
+        parts = [ticker, time_period] + [f"{name}={etag}" for name, etag in sorted(etags.items())]
+        response.set_etag(hashlib.sha1("|".join(parts).encode()).hexdigest())
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route("/api/stock-data/stream", methods=["GET", "POST"])
+def stream_stock_data():
+    # Same request as /api/stock-data, answered as NDJSON: one line per
+    # section as soon as it is built, each with its section id and the
+    # milliseconds since the request started, then a final "done" line
+    data = request.json if request.method == "POST" else request.args
+    ticker, company_name, time_period, sections = stock_data_sections(data)
+
+    def generate():
+        started = time.monotonic()
+
+        def line(section, **fields):
+            elapsed_ms = round((time.monotonic() - started) * 1000)
+            return app.json.dumps({"section": section, "elapsed_ms": elapsed_ms, **fields}) + "\n"
+
+        yield line("company", company=company_name, ticker_symbol=ticker)
+        errors = {}
+        for name, entry, error in iter_sections(sections):
+            if error is not None:
+                errors[name] = error
+                yield line(name, data=None, error=error)
+                continue
+            payload = entry.payload
+            if name == "info" and payload:
+                payload = with_logo(payload)
+            yield line(name, data=payload)
+        yield line("done", errors=errors)
+
+    response = app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.cache_control.no_cache = True
+    # Keep proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def stock_data_sections(data):
+    # Request fields shared by /api/stock-data and its streaming variant
     ticker = data.get("company")
 
     company_name = sp500Json[ticker]["Security"]
 
     time_period = valid_time_periods[data.get("time_period")]
 
-    # Get company basic info
-    info = get_company_basic_info(ticker)
+    # Compact mode embeds charts as objects with typed arrays (see charts.py)
+    compact = _flag(data.get("compact"))
+    # Optional point budget for the price and forecast histories (see downsample.py)
+    max_points = parse_max_points(data.get("max_points"))
+    sections = build_stock_data_sections(ticker, company_name, time_period, compact, max_points)
+    return ticker, company_name, time_period, sections
+
+
+def with_logo(info):
+    # The logo is filled in per response, so one resolved after the info
+    # section was cached still shows up
+    return {**info, "Company Logo": logo_cache.lookup(info.get("Website"))}
+
 
-    # Get company summary metrics
-    summary_data = get_company_summary(ticker, company_name, time_period)
+def build_stock_data_sections(ticker, company_name, time_period, compact=False, max_points=None):
+    # Every section below reads from the same snapshot, so each Yahoo dataset
+    # is fetched once per request
+    snapshot = TickerSnapshot(ticker)
 
     industry_name = sp500Json[ticker]['GICS Sector']
 
-    # get other companies in the same industry for basket comparison
-    companies_in_industry = []
+    def cached(section, period, build, as_of=lambda: snapshot.as_of, expiry=None):
+        # Payloads are reused until their data's as-of date moves on or the
+        # exchange calendar says they may be stale (see chart_cache.py);
+        # expiry overrides the period the calendar is asked about
+        def run():
+            key = (section, ticker, period, as_of(), compact, max_points)
+            return chart_cache.get_or_build(key, build, expiry or period)
+        return run
+
+    # Section name in the response -> builder; the price plot slices the
+    # requested period out of the snapshot's daily history
+    return {
+        "info": cached("info", "max", lambda: get_company_basic_info(snapshot)),
+        # The summary carries the live price, high and low whatever the period
+        "summary_data": cached(
+            "summary_data", time_period, lambda: get_company_summary(snapshot, company_name, time_period),
+            expiry="1d",
+        ),
+        "plot": cached("plot", time_period, lambda: generate_timeseries_plot(
+            snapshot.history(time_period), company_name, compact, max_points
+        )),
+        "forecast_plot": cached(
+            "forecast_plot", "max", lambda: generate_arima_forecast_timeseries(snapshot, compact, max_points)
+        ),
+        "industry_plot": cached(
+            "industry_plot", "max", lambda: generate_industry_plot(industry_name, ticker, compact),
+            as_of=lambda: sector_fundamentals.refreshed_at,
+        ),
+        "monetary_plot": cached(
+            "monetary_plot", "1d", lambda: generate_monetary_charts_1d(snapshot, company_name, compact)
+        ),
+    }
 
-    for ticker in sp500Json:
-        if sp500Json[ticker]["GICS Sector"] == industry_name:
-            print(ticker)
-            companies_in_industry.append((ticker, sp500Json[ticker]["Security"]))
 
-    ticker = data.get("company")
-    time_period = valid_time_periods[data.get("time_period")]
-    
-    # Fetch stock data
-    stock_data = yf.Ticker(ticker).history(period=time_period)
+def _flag(value):
+    # JSON booleans, or "1" / "true" from a query string
+    return value is True or str(value).lower() in ("1", "true")
 
-    # Generate plots
-    plotJSON = generate_timeseries_plot(stock_data, company_name)
-    forecastPlotJSON = generate_arima_forecast_timeseries(ticker)
-    industryPEPlotJson = generate_industry_plot(companies_in_industry, industry_name, ticker)
-    company_bar_chartsJSON = generate_monetary_charts_1d(ticker, company_name)
 
-    result = {
-        "company": company_name,
-        "info": info,
-        "ticker_symbol": ticker,
-        "summary_data": summary_data,
-        "plot": plotJSON,
-        "forecast_plot": forecastPlotJSON,
-        "summary_data": summary_data,
-        "monetary_plot": company_bar_chartsJSON,
-        "industry_plot": industryPEPlotJson
+def parse_max_points(value):
+    # None (send every point) unless a positive point budget was given
+    try:
+        max_points = int(value)
+    except (TypeError, ValueError):
+        return None
+    return max_points if max_points > 0 else None
+
+
+def iter_sections(sections):
+    """Run section builders concurrently and yield (name, result, error) in
+    the order they finish.
+
+    Each section has its own timeout; one that fails or times out is
+    yielded with result None and a message, so the others still arrive.
+    """
+    started = time.monotonic()
+    pending = {section_executor.submit(build): name for name, build in sections.items()}
+    deadlines = {
+        name: started + section_timeouts.get(name, SECTION_TIMEOUT) for name in sections
     }
-    
 
-    return jsonify(result)
+    while pending:
+        next_deadline = min(deadlines[name] for name in pending.values())
+        done, _ = wait(
+            pending, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED
+        )
+        for future in done:
+            name = pending.pop(future)
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                print(f"Error building {name}: {e}")
+                yield name, None, str(e)
+
+        now = time.monotonic()
+        for future, name in list(pending.items()):
+            if deadlines[name] <= now:
+                # The worker thread can't be interrupted; drop it if not started
+                future.cancel()
+                del pending[future]
+                timeout = section_timeouts.get(name, SECTION_TIMEOUT)
+                yield name, None, f"Timed out after {timeout:.0f}s"
+
+
+def run_sections(sections):
+    """Run section builders concurrently, each under its own timeout.
+
+    Returns (results, errors). A section that fails or times out is None in
+    results and has a message in errors, so the rest of the page still loads.
+    """
+    results = {}
+    errors = {}
+    for name, result, error in iter_sections(sections):
+        results[name] = result
+        if error is not None:
+            errors[name] = error
+    # Keep the response's section order independent of finishing order
+    return {name: results[name] for name in sections}, errors
+
+
+@app.route("/api/forecast-jobs", methods=["POST"])
+def submit_forecast_job():
+    data = request.json
+    ticker = data.get("company")
 
+    if ticker not in sp500Json:
+        return jsonify({"error": "Unknown ticker."}), 400
 
-def generate_arima_forecast_timeseries(ticker):
+    try:
+        job = forecast_jobs.submit(ticker)
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify(job_status(job)), 202
+
+
+@app.route("/api/forecast-jobs/<job_id>", methods=["GET"])
+def get_forecast_job(job_id):
+    job = forecast_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired forecast job."}), 404
+
+    status = job_status(job)
+    if job["status"] == "done":
+        compact = _flag(request.args.get("compact"))
+        max_points = parse_max_points(request.args.get("max_points"))
+        result = job["result"]
+
+        def build():
+            # From the worker's arrays and the stored history
+            stock_data = get_store().read(job["ticker"], ARIMA_START, ARIMA_END)
+            return generate_forecast_plot(
+                job["ticker"],
+                stock_data,
+                np.array(result["forecast"]),
+                np.column_stack([result["lower"], result["upper"]]),
+                compact,
+                max_points,
+            )
+
+        # Cached per job and rendering options, like the other charts
+        key = ("forecast_job", job_id, compact, max_points)
+        status["forecast_plot"] = chart_cache.get_or_build(key, build, "max").payload
+    return jsonify(status)
+
+
+def job_status(job):
+    status = {key: job[key] for key in ("id", "ticker", "status", "submitted_at", "finished_at")}
+    if job["error"] is not None:
+        status["error"] = job["error"]
+    return status
+
+
+def generate_arima_forecast_timeseries(snapshot, compact=False, max_points=None):
+    import statsmodels.api as sm
+
+    ticker = snapshot.ticker
     print(f"\nFetching data for {ticker}...\n")
-    stock_data = yf.download(ticker, start="2015-01-01", end="2024-01-01")
+    stock_data = snapshot.history_between(start=ARIMA_START, end=ARIMA_END)
+
+    # Serve the nightly batch forecast when it covers this training window
+    precomputed = batch_forecasts.get(ticker, stock_data.index[-1])
+    if precomputed is not None:
+        forecast, conf_int = precomputed
+        return generate_forecast_plot(ticker, stock_data, forecast, conf_int, compact, max_points)
 
     # Augmented Dickey-Fuller test to check if time series is stationary
     result = sm.tsa.adfuller(stock_data["Close"])
     print(f"ADF Statistic: {result[0]}")
     print(f"p-value: {result[1]}")
 
-    stock_diff = stock_data["Close"].diff().dropna()
-    arima_model = auto_arima(stock_diff, seasonal=False, trace=True, stepwise=True)
+    # Fits the ticker's cached (p,d,q) order unless a full search is due
+    forecast, conf_int = arima_forecast(ticker, stock_data["Close"])
+    return generate_forecast_plot(ticker, stock_data, forecast, conf_int, compact, max_points)
+
 
-    n_periods = 30
-    forecast, conf_int = arima_model.predict(n_periods=n_periods, return_conf_int=True)
-    forecast_dates = pd.date_range(stock_data.index[-1], periods=n_periods, freq="B")
+def generate_forecast_plot(ticker, stock_data, forecast, conf_int, compact=False, max_points=None):
+    import plotly.graph_objects as go
+
+    forecast_dates = pd.date_range(stock_data.index[-1], periods=N_PERIODS, freq="B")
+
+    # The history is only context for the forecast, so it can be thinned out
+    stock_data = downsample(stock_data, max_points)
 
     fig = go.Figure()
 
@@ -131,8 +532,7 @@ def generate_arima_forecast_timeseries(ticker):
             mode="lines",
             name=f"{ticker} Stock Price",
             line=dict(color="green", width=2),
-            hoverinfo="text",
-            hovertext=stock_data["Close"].apply(lambda x: f"Price: ${x:.2f}"),
+            hovertemplate="Price: $%{y:.2f}<extra></extra>",
         )
     )
 
@@ -140,7 +540,7 @@ def generate_arima_forecast_timeseries(ticker):
     fig.add_trace(
         go.Scatter(
             x=forecast_dates,
-            y=forecast.cumsum() + stock_data["Close"].iloc[-1],
+            y=forecast,
             mode="lines",
             name="Forecast",
             line=dict(color="red", width=2),
@@ -151,7 +551,7 @@ def generate_arima_forecast_timeseries(ticker):
     fig.add_trace(
         go.Scatter(
             x=forecast_dates,
-            y=conf_int[:, 0].cumsum() + stock_data["Close"].iloc[-1],
+            y=conf_int[:, 0],
             mode="lines",
             line=dict(color="red", width=0),
             showlegend=False,
@@ -161,7 +561,7 @@ def generate_arima_forecast_timeseries(ticker):
     fig.add_trace(
         go.Scatter(
             x=forecast_dates,
-            y=conf_int[:, 1].cumsum() + stock_data["Close"].iloc[-1],
+            y=conf_int[:, 1],
             mode="lines",
             line=dict(color="red", width=0),
             fill="tonexty",
@@ -182,93 +582,21 @@ def generate_arima_forecast_timeseries(ticker):
         margin=dict(l=40, r=40, t=40, b=40),
     )
 
-    graphJSON = plotly.io.to_json(fig, pretty=True)
-    return graphJSON
+    return chart_payload(fig, compact)
 
 
-"""
-Get news from AlphaVantage API; API key may be invalid after October 16 2024
-"""
 @app.route("/api/news", methods=["POST"])
 def get_cleaned_news():
     data = request.json
     ticker_symbol = data.get("company")
+    if not ticker_symbol:
+        return jsonify({"error": "Company ticker is required."}), 400
 
-    API_key = "wepcdviwg2zsakkku9cup9x3aua7gxia2790oc2k"
-    url1 = f"https://stocknewsapi.com/api/v1/stat?&tickers={ticker_symbol}&date=last30days&page=1&token={API_key}"
-    url2 = f"https://stocknewsapi.com/api/v1?tickers={ticker_symbol}&items=3&page=1&token={API_key}"
-
+    # Top headlines and 30-day sentiment, cached per ticker (see news.py)
     try:
-        response = requests.get(url1)
-        if response.status_code == 200:
-            sentiment_data = response.json()
-        else:
-            print(f"Error: {response.status_code}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-        return None
-
-    try:
-        response = requests.get(url2)
-        if response.status_code == 200:
-            news_data = response.json()
-        else:
-            print(f"Error: {response.status_code}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-        return None
-
-    print(sentiment_data, "getttying thre keys !!!!!!!!!!!!!!!!!")
-    sentiment_score = sentiment_data["total"][ticker_symbol]["Sentiment Score"]
-
-    print(sentiment_data["total"][ticker_symbol]["Sentiment Score"])
-    
-    # Extract required information
-    news_articles = news_data["data"]
-    req_field = ["title", "news_url", "text"]
-
-    cleaned_news = []
-    for i in range(3):
-        news = {j: news_articles[i][j] for j in req_field}
-        cleaned_news.append(news)
-
-    # Extract top 3 news articles
-    top_news = {}
-    for i in range(3):  # Ensure we don't go beyond the available articles
-        top_news[i + 1] = {j: cleaned_news[i][j] for j in ("title", "news_url", "text")}
-
-    # Print top news headlines with cleaned titles
-    print("======================= Top News ===============================")
-    for i, j in top_news.items():
-        title_cleaned = re.sub(r"\s*\(\s*NASDAQ:\w+\s*\)", "", j["title"])
-        print(
-            f"Headline - {i} \n {j['title']}\n Summary: \n {j['text']} \n Link: \n {j['news_url']}\n\n"
-        )
-
-    # Calculate the average overall sentiment score
-    # total_score = sum(item["overall_sentiment_score"] for item in cleaned_news)
-    # avg_score = total_score / news_len if news_len > 0 else 0
-
-    # Determine sentiment category based on average sentiment score
-    if sentiment_score < -0.5:
-        avg_sentiment_category = "Bearish"
-    elif sentiment_score > 0.5:
-        avg_sentiment_category = "Bullish"
-    else:
-        avg_sentiment_category = "Neutral"
-
-    print(
-        f"The average overall sentiment score is: {sentiment_score} ({avg_sentiment_category})"
-    )
-
-    # Preparing the dictionary to send to the front end
-    news_for_frontend = {
-        "top_news": top_news,
-        "average_sentiment_score": sentiment_score,
-        "avg_sentiment_category": avg_sentiment_category,  # Add sentiment category
-    }
+        news_for_frontend = news_cache.get(ticker_symbol)
+    except NewsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
 
     return jsonify(news_for_frontend)
 
@@ -281,314 +609,214 @@ def stock_valuation():
     if not company:
         return jsonify({"error": "Company name is required."}), 400
 
+    # Optional WACC x terminal growth sensitivity grid, e.g.
+    # "sensitivity": true or {"steps": 21, "wacc_range": 0.02, "terminal_growth_range": 0.015}
+    sensitivity = data.get("sensitivity")
+    if sensitivity:
+        options = sensitivity if isinstance(sensitivity, dict) else {}
+        try:
+            steps = min(max(int(options.get("steps", 21)), 2), 101)
+            wacc_range = float(options.get("wacc_range", 0.02))
+            terminal_growth_range = float(options.get("terminal_growth_range", 0.015))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Sensitivity steps must be an integer and its ranges numbers."}), 400
+        if not (0 <= wacc_range < 1 and 0 <= terminal_growth_range < 1):
+            return jsonify({"error": "Sensitivity ranges must be between 0 and 1."}), 400
+
+    run_monte_carlo = data.get("mode") == "monte_carlo"
+    if run_monte_carlo:
+        try:
+            paths = max(1, min(int(data.get("paths", 100_000)), MAX_SIMULATION_PATHS))
+            seed = int(data.get("seed", 0))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Monte Carlo paths and seed must be integers."}), 400
+        if seed < 0:
+            return jsonify({"error": "Monte Carlo seed must not be negative."}), 400
+
     ticker_input = get_ticker(company)
+    if ticker_input is None:
+        return jsonify({"error": f"No ticker found for {company}."}), 404
     ticker = ticker_input.upper()
 
     stock = yf.Ticker(ticker)
-    info = stock.info
-
-    income_stmt = stock.financials
-    cash_flow = stock.cashflow
-    balance_sheet = stock.balance_sheet
-
-    if income_stmt.empty or cash_flow.empty or balance_sheet.empty:
-        return jsonify({"error": "Financial data not available for this ticker."}), 400
-
-    sector = info.get("sector", "Unknown")
-    company = info.get("shortName", "Unknown")
-
-    possible_operating_cf_keys = [
-        "Total Cash From Operating Activities",
-        "Net Cash Provided by Operating Activities",
-        "Operating Cash Flow",
-        "Cash from Operating Activities",
-    ]
-
-    possible_capex_keys = [
-        "Capital Expenditures",
-        "Investment in Property, Plant and Equipment",
-        "Purchases of Property and Equipment",
-        "Capital Expenditure",
-    ]
-
-    def get_cash_flow_item(cash_flow_df, possible_keys):
-        for key in possible_keys:
-            if key in cash_flow_df.index:
-                return cash_flow_df.loc[key]
-        return None
-
-    operating_cf = get_cash_flow_item(cash_flow, possible_operating_cf_keys)
-    capex = get_cash_flow_item(cash_flow, possible_capex_keys)
-
-    if operating_cf is None or capex is None:
-        return (
-            jsonify(
-                {"error": "Necessary financial data not found in cash flow statement."}
-            ),
-            400,
-        )
-
-    # Get EBITDA
-    try:
-        ebitda_series = income_stmt.loc["EBITDA"]
-        ebitda_series = ebitda_series.sort_index(ascending=True)
-        ebitda_values = ebitda_series.values
-    except KeyError:
-        return (
-            jsonify({"error": "EBITDA data not available."}),
-            400,
-        )
-
-    # Check for zero or negative EBITDA
-    if ebitda_values[-1] <= 0 or np.isnan(ebitda_values[-1]):
-        return (
-            jsonify({"error": "EBITDA data is invalid or non-positive."}),
-            400,
-        )
-
-    fcf = operating_cf - capex
-    fcf = fcf.sort_index(ascending=True)
-    fcf_values = fcf.values
-    years = fcf.index
-
-    if len(fcf_values) < 2:
-        return jsonify({"error": "Not enough data to perform DCF."}), 400
-
-    # Calculate historical EBITDA growth rates
-    growth_rates = []
-    for i in range(1, len(ebitda_values)):
-        if ebitda_values[i - 1] != 0:
-            growth = (ebitda_values[i] - ebitda_values[i - 1]) / abs(
-                ebitda_values[i - 1]
-            )
-            growth_rates.append(growth)
 
-    if len(growth_rates) > 0:
-        avg_growth_rate = np.mean(growth_rates)
-        if np.isnan(avg_growth_rate) or np.isinf(avg_growth_rate):
-            avg_growth_rate = 0.05  # Default to 5% if invalid
-    else:
-        avg_growth_rate = 0.05  # Assume 5% growth rate if data insufficient
-
-    # Calculate WACC
-    # Cost of Equity using CAPM
-    beta = info.get("beta", 1.0)
-    if beta is None or np.isnan(beta):
-        beta = 1.0  # Default beta
-    risk_free_rate = 0.02  # 2% risk-free rate
-    market_return = 0.08  # 8% expected market return
-    cost_of_equity = risk_free_rate + beta * (market_return - risk_free_rate)
-
-    # Ensure cost_of_equity is valid
-    if np.isnan(cost_of_equity) or cost_of_equity <= 0:
-        cost_of_equity = 0.08  # Default to 8%
-
-    # Cost of Debt
-    try:
-        total_debt = balance_sheet.loc["Long Term Debt"].iloc[0]
-    except KeyError:
-        total_debt = balance_sheet.loc["Long Term Debt"].iloc[0]
     try:
-        interest_expense = income_stmt.loc["Interest Expense"].iloc[0]
-    except KeyError:
-        interest_expense = 0
-
-    if total_debt > 0:
-        cost_of_debt = abs(interest_expense) / total_debt
-    else:
-        cost_of_debt = 0
-
-    # Tax Rate
-    try:
-        income_before_tax = income_stmt.loc["Income Before Tax"].iloc[0]
-        income_tax_expense = income_stmt.loc["Income Tax Expense"].iloc[0]
-        tax_rate = income_tax_expense / income_before_tax
-    except KeyError:
-        tax_rate = 0.21  # Assume 21% tax rate if data not available
-
-    # Capital Structure
-    market_cap = info.get("marketCap", 0)
-    total_value = market_cap + total_debt
-    if total_value == 0:
-        return (
-            jsonify(
-                {"error": "Market capitalization or total debt data not available."}
-            ),
-            400,
-        )
-
-    weight_of_equity = market_cap / total_value
-    weight_of_debt = total_debt / total_value
+        inputs = valuation_inputs(stock.info, stock.financials, stock.cashflow, stock.balance_sheet)
+        # WACC from CAPM cost of equity and the after-tax cost of debt
+        WACC = base_discount_rate(inputs)
+    except ValuationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # WACC Calculation
-
-    WACC = (weight_of_equity * cost_of_equity) + (
-        weight_of_debt * cost_of_debt * (1 - tax_rate)
-    )
-    if np.isnan(WACC) or WACC <= 0:
-        return (
-            jsonify({"error": "MACC Calculation invalid"}),
-            400,
-        )
-
-    # Ensure WACC is greater than terminal growth rate
-    terminal_growth_rate = 0.025
-    if WACC <= terminal_growth_rate:
-        print("WACC is less than or equal to terminal growth rate. Adjusting WACC.")
-        WACC = (
-            terminal_growth_rate + 0.01
-        )  # Set WACC slightly above terminal growth rate
-
-    # Project FCF into the future
-    forecast_years = 5
-    forecast_fcf = []
-    last_fcf = fcf_values[-1]
-    forecast_ebitda = []
-    last_ebitda = ebitda_values[-1]
-
-    for i in range(1, forecast_years + 1):
-        projected_ebitda = last_ebitda * ((1 + avg_growth_rate) ** i)
-        forecast_ebitda.append(projected_ebitda)
-
-    for i in range(1, forecast_years + 1):
-        projected_fcf = last_fcf * ((1 + avg_growth_rate) ** i)
-        forecast_fcf.append(projected_fcf)
-
-    # Discount forecasted FCF
-    discounted_fcf = []
-    for i in range(1, forecast_years + 1):
-        pv = forecast_fcf[i - 1] / ((1 + WACC) ** i)
-        discounted_fcf.append(pv)
-
-    # Calculate terminal value
-    terminal_growth_rate = 0.025
-    terminal_value = (
-        forecast_fcf[-1] * (1 + terminal_growth_rate) / (WACC - terminal_growth_rate)
-    )
-    terminal_value_pv = terminal_value / ((1 + WACC) ** forecast_years)
-
-    # Assume constant D&A and calculate EBIT
-    try:
-        depreciation = income_stmt.loc["Depreciation"].iloc[0]
-    except KeyError:
-        depreciation = 0  # Assume zero if data not available
-
-    forecast_ebit = [ebitda - depreciation for ebitda in forecast_ebitda]
-
-    # Calculate NOPAT (Net Operating Profit After Tax)
-    nopat = [ebit * (1 - tax_rate) for ebit in forecast_ebit]
-
-    # Discount forecasted NOPAT
-    discounted_cash_flows = []
-    for i in range(1, forecast_years + 1):
-        pv = nopat[i - 1] / ((1 + WACC) ** i)
-        discounted_cash_flows.append(pv)
-
-    # Calculate terminal value
-    terminal_value = (
-        nopat[-1] * (1 + terminal_growth_rate) / (WACC - terminal_growth_rate)
-    )
-    terminal_value_pv = terminal_value / ((1 + WACC) ** forecast_years)
-
-    # Check for NaN or infinite terminal value
-    if np.isnan(terminal_value_pv) or np.isinf(terminal_value_pv):
-        print("Terminal value calculation invalid.")
-        return
-
-    # Enterprise Value
-    enterprise_value = sum(discounted_cash_flows) + terminal_value_pv
+    # Project and discount NOPAT and FCF, plus terminal values
+    values = dcf_values(inputs, inputs["avg_growth_rate"], WACC)
 
     # Check for NaN or infinite enterprise value
+    enterprise_value = values["enterprise_value"]
     if np.isnan(enterprise_value) or np.isinf(enterprise_value):
         print("Enterprise value calculation invalid.")
-        return
-
-    # Get Cash and Cash Equivalents
-    try:
-        cash_and_equiv = (
-            balance_sheet.loc["Cash"].iloc[0]
-            + balance_sheet.loc["Short Term Investments"].iloc[0]
-        )
-    except KeyError:
-        try:
-            cash_and_equiv = balance_sheet.loc["Cash"].iloc[0]
-        except KeyError:
-            cash_and_equiv = 0  # If cash data not available
-
-    # Calculate Net Debt
-    net_debt = total_debt - cash_and_equiv
-
-    # Calculate Equity Value
-    equity_value = enterprise_value - net_debt
-
-    # Convert values to millions
-    enterprise_value_millions = enterprise_value / 1e6
-    net_debt_millions = net_debt / 1e6
-    equity_value_millions = equity_value / 1e6
-
-    # DCF value
-    dcf_value = sum(discounted_fcf) + terminal_value_pv
-
-    # Get shares outstanding
-    shares_outstanding = info.get("sharesOutstanding", 0)
-
-    if shares_outstanding == 0:
-        return jsonify({"error": "Shares outstanding not available."}), 400
-
-    # Decided to take this out before final
-    intrinsic_value_per_share = dcf_value / shares_outstanding
+        return jsonify({"error": "Enterprise value calculation invalid."}), 400
 
     # Convert values to millions
     enterprise_value_millions = enterprise_value / 1e6
-    net_debt_millions = net_debt / 1e6
-    equity_value_millions = equity_value / 1e6
+    net_debt_millions = values["net_debt"] / 1e6
+    equity_value_millions = values["equity_value"] / 1e6
 
     # Prepare output
-    data = {
+    result = {
         "Ticker": ticker,
-        "Company Name": company,
-        "Sector": sector,
+        "Company Name": inputs["company"],
+        "Sector": inputs["sector"],
         "Enterprise Value (Millions)": f"$ {enterprise_value_millions:.2f} mil",
         "Net Debt (Millions)": f"$ {net_debt_millions:.2f} mil",
         "Equity Value (Millions)": f" $ {equity_value_millions:.2f} mil",
     }
 
-    return jsonify(data)
+    if sensitivity:
+        wacc_axis, growth_axis, grid = sensitivity_grid(
+            inputs,
+            WACC,
+            steps=steps,
+            wacc_range=wacc_range,
+            terminal_growth_range=terminal_growth_range,
+        )
+        result["Sensitivity"] = {
+            "wacc": wacc_axis.round(6).tolist(),
+            "terminal_growth": growth_axis.round(6).tolist(),
+            "enterprise_value_millions": _json_grid(grid["enterprise_value"] / 1e6),
+            "equity_value_millions": _json_grid(grid["equity_value"] / 1e6),
+            "equity_value_per_share": _json_grid(grid["equity_value_per_share"]),
+        }
+
+    # Optional Monte Carlo mode: EBITDA growth, beta, cost of debt and terminal
+    # growth are drawn from distributions fitted to the company's history, and
+    # the response carries percentiles of equity value per share
+    if run_monte_carlo:
+        distributions = fit_distributions(inputs, estimate_company_beta(ticker))
+        simulated = simulate(inputs, distributions, paths=paths, seed=seed)
+        result["Monte Carlo"] = {
+            **summarize(simulated),
+            "seed": seed,
+            "distributions": distributions,
+        }
 
+    return jsonify(result)
 
-def get_company_logo(company_domain):
-    # Using Clearbit's logo API to get the company logo
-    logo_url = f"https://logo.clearbit.com/{company_domain}"
 
+@app.route("/api/stock-valuation/batch", methods=["POST"])
+def stock_valuation_batch():
+    # Values {"tickers": [...]} or every company of {"sector": "<GICS sector>"}.
+    # Statements are fetched concurrently, the DCF runs once over all of the
+    # companies, and a company that can't be valued gets its error in its row
+    data = request.json or {}
+    sector = data.get("sector")
+    if sector:
+        if sector not in sector_fundamentals.sector_index:
+            return jsonify({"error": f"Unknown sector: {sector}"}), 400
+        tickers = [ticker for ticker, _ in sector_fundamentals.sector_index[sector]]
+    else:
+        tickers = data.get("tickers")
+        if not isinstance(tickers, list) or not tickers:
+            return jsonify({"error": "A list of tickers or a sector is required."}), 400
+        tickers = list(dict.fromkeys(str(ticker).strip().upper() for ticker in tickers))
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"At most {MAX_BATCH_TICKERS} tickers per request."}), 400
+
+    started = time.perf_counter()
+    # Rows keep the Wikipedia symbol (BRK.B); Yahoo is asked for its own (BRK-B)
+    futures = {
+        ticker: valuation_executor.submit(fetch_valuation_inputs, yahoo_symbol(ticker)) for ticker in tickers
+    }
+    deadline = time.monotonic() + VALUATION_TIMEOUT
+    errors = {}
+    fetched = {}
+    for ticker, future in futures.items():
+        try:
+            fetched[ticker] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except ValuationError as e:
+            errors[ticker] = str(e)
+        except SectionTimeout:
+            future.cancel()
+            errors[ticker] = "Timed out fetching financial data."
+        except Exception as e:
+            print(f"Error fetching financial data for {ticker}: {e}")
+            errors[ticker] = "Financial data not available for this ticker."
+
+    valued = {}
+    if fetched:
+        inputs = stack_inputs(fetched.values())
+        rates = discount_rates(inputs)
+        values = dcf_values(inputs, inputs["avg_growth_rate"], rates)
+        for i, ticker in enumerate(fetched):
+            if np.isnan(rates[i]):
+                errors[ticker] = "MACC Calculation invalid"
+            elif not np.isfinite(values["enterprise_value"][i]):
+                errors[ticker] = "Enterprise value calculation invalid."
+            else:
+                valued[ticker] = {
+                    "WACC": round(float(rates[i]), 6),
+                    "Enterprise Value (Millions)": round(float(values["enterprise_value"][i]) / 1e6, 2),
+                    "Net Debt (Millions)": round(float(values["net_debt"][i]) / 1e6, 2),
+                    "Equity Value (Millions)": round(float(values["equity_value"][i]) / 1e6, 2),
+                    "Equity Value Per Share": round(float(values["equity_value_per_share"][i]), 2),
+                }
+
+    rows = []
+    for ticker in tickers:
+        inputs = fetched.get(ticker, {})
+        row = {
+            "Ticker": ticker,
+            "Company Name": inputs.get("company"),
+            "Sector": inputs.get("sector"),
+            "error": errors.get(ticker),
+        }
+        row.update(valued.get(ticker, {}))
+        rows.append(row)
+
+    return jsonify({
+        "sector": sector,
+        "valued": len(valued),
+        "failed": len(errors),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        "rows": rows,
+    })
+
+
+def fetch_valuation_inputs(ticker):
+    snapshot = TickerSnapshot(ticker)
+    return valuation_inputs(snapshot.info, snapshot.financials, snapshot.cashflow, snapshot.balance_sheet)
+
+
+def estimate_company_beta(ticker, years=2):
+    # Beta (and its standard error) against the S&P 500 from stored prices
+    start = pd.Timestamp.today() - pd.DateOffset(years=years)
     try:
-        response = requests.get(logo_url)
-        response.raise_for_status()
-        return logo_url
+        stock_close = get_store().get_history(ticker, start=start)["Close"]
+        market_close = get_store().get_history("^GSPC", start=start)["Close"]
+        return estimate_beta(stock_close, market_close)
     except Exception as e:
-        print(f"Could not retrieve logo for {company_domain}: {e}")
+        print(f"Could not estimate beta for {ticker}: {e}")
         return None
 
 
-def generate_industry_plot(companies, industry, chosen_company):
-    pe_ratios = []
-    market_caps = []
+def _json_grid(values):
+    # Rows of rounded values, with invalid cells (WACC <= growth) as null
+    return [
+        [None if not np.isfinite(v) else round(float(v), 4) for v in row]
+        for row in values
+    ]
 
-    for ticker_symbol, name in companies:
-        try:
-            company = yf.Ticker(ticker_symbol)
-            info = company.info
 
-            # Append values for each company in the industry
-            if info.get("trailingPE") and info.get("marketCap"):
-                pe_ratios.append(info.get("trailingPE", 0))
-                market_caps.append(info.get("marketCap", 0))
+def generate_industry_plot(industry, chosen_company, compact=False):
+    import plotly.graph_objects as go
 
-        except Exception as e:
-            print(f"Error fetching data for {ticker_symbol}: {e}")
-            continue
+    # Peers come from the precomputed fundamentals table; each row keeps its
+    # company and P/E together, so skipped peers can't shift the pairing
+    peers = sector_fundamentals.peers(industry)
+    if not peers:
+        raise ValueError(f"No P/E data available for {industry}")
 
     # Combine companies and P/E ratios into a list of tuples
-    combined_data = list(zip(companies, pe_ratios))
+    combined_data = [((ticker, name), pe) for ticker, name, pe, _ in peers]
 
     # Sort the combined data by P/E ratio in descending order
     sorted_data = sorted(combined_data, key=lambda x: x[1], reverse=True)
@@ -624,27 +852,26 @@ def generate_industry_plot(companies, industry, chosen_company):
         template="plotly_white",  # Use a clean white template,
     )
 
-    graphJSON = plotly.io.to_json(fig, pretty=True)
-    return graphJSON
+    return chart_payload(fig, compact)
 
 
 def get_ticker(company_name):
-    yfinance = "https://query2.finance.yahoo.com/v1/finance/search"
-    user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-    params = {"q": company_name, "quotes_count": 1, "country": "United States"}
-
-    res = requests.get(url=yfinance, params=params, headers={"User-Agent": user_agent})
-    data = res.json()
-
-    company_code = data["quotes"][0]["symbol"]
-    return company_code
+    # Exact S&P 500 symbols and names resolve from the local index; Yahoo's
+    # search is asked about the rest, and remembers its answers. A near miss
+    # in the index is only used when Yahoo has nothing (or can't be reached).
+    ticker = ticker_index.resolve(company_name)
+    if ticker is not None:
+        return ticker
+    try:
+        ticker = search_ticker(company_name)
+    except requests.RequestException as e:
+        print(f"Ticker search for {company_name!r} failed: {e}")
+    return ticker or ticker_index.closest(company_name)
 
 
-def get_company_basic_info(ticker):
-    stock = yf.Ticker(ticker)
-
+def get_company_basic_info(snapshot):
     # Retrieve company info from Yahoo Finance
-    info = stock.info
+    info = snapshot.info
 
     # Extract full address information
     address1 = info.get("address1", "N/A")
@@ -675,7 +902,8 @@ def get_company_basic_info(ticker):
     compensation_risk = info.get("compensationRisk", "N/A")
     shareholder_rights_risk = info.get("shareHolderRightsRisk", "N/A")
     overall_risk = info.get("overallRisk", "N/A")
-    logo = get_company_logo(company_domain)
+    # From the logo cache; an unknown domain is checked in the background
+    logo = logo_cache.lookup(company_domain)
 
     info_dict = {
         "Company Summary": company_summary,
@@ -686,16 +914,79 @@ def get_company_basic_info(ticker):
         "Compensation Risk": compensation_risk,
         "Shareholder Rights Risk": shareholder_rights_risk,
         "Overall Risk": overall_risk,
+        "Website": company_domain,
         "Company Logo": logo,
     }
 
     return info_dict
 
 
-# Predict using the combined model
+@app.route("/api/predict-price", methods=["POST"])
+def predict_prices():
+    data = request.json or {}
+    tickers = data.get("tickers")
+    if tickers is None and data.get("company"):
+        tickers = [data.get("company")]
+    if (
+        not isinstance(tickers, list)
+        or not tickers
+        or not all(isinstance(t, str) and t.strip() for t in tickers)
+    ):
+        return jsonify({"error": "A list of tickers is required."}), 400
+    tickers = list(dict.fromkeys(t.strip() for t in tickers))
+    if len(tickers) > MAX_PREDICT_TICKERS:
+        return jsonify({"error": f"At most {MAX_PREDICT_TICKERS} tickers per request."}), 400
+
+    # Build every ticker's window (histories fetched side by side), then run
+    # them through one stacked batch
+    def fetch_window(ticker):
+        stock_data = get_store().get_history(ticker, start="2010-01-01", end="2024-10-01")
+        return prediction_window(stock_data["Close"])
+
+    futures = {ticker: valuation_executor.submit(fetch_window, ticker) for ticker in tickers}
+    deadline = time.monotonic() + PREDICT_TIMEOUT
+    predictions = {}
+    windows = []
+    scales = []
+    for ticker, future in futures.items():
+        try:
+            window, low, span = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except SectionTimeout:
+            future.cancel()
+            predictions[ticker] = {"error": "Timed out fetching price history."}
+            continue
+        except Exception as e:
+            predictions[ticker] = {"error": str(e)}
+            continue
+        windows.append(window)
+        scales.append((ticker, low, span))
+
+    if windows:
+        try:
+            predicted_scaled = prediction_batcher.submit(np.stack(windows)).result(timeout=PREDICT_TIMEOUT)
+        except SectionTimeout:
+            return jsonify({"error": "Timed out waiting for the prediction model."}), 503
+        except Exception as e:
+            print(f"Prediction failed for {', '.join(t for t, _, _ in scales)}: {e}")
+            return jsonify({"error": f"Prediction unavailable: {e}"}), 503
+        for (ticker, low, span), value in zip(scales, predicted_scaled[:, 0]):
+            predictions[ticker] = {"predicted_price": float(value * span + low)}
+
+    return jsonify({"predictions": [{"ticker": t, **predictions[t]} for t in tickers]})
+
+
+@app.route("/api/predict-price/metrics", methods=["GET"])
+def predict_price_metrics():
+    return jsonify(prediction_batcher.metrics())
+
+
+# Predict using the combined model; model can be the Keras model or the
+# NumpyLSTM runtime, which has the same predict()
 def predict_stock_price_combined_model(ticker, model, seq_length=60):
-    # Download stock data
-    stock_data = yf.download(ticker, start="2010-01-01", end="2024-10-01")
+    from sklearn.preprocessing import MinMaxScaler
+
+    # Read stock data from the local store (only the missing tail is downloaded)
+    stock_data = get_store().get_history(ticker, start="2010-01-01", end="2024-10-01")
 
     if stock_data.empty:
         print(f"No data found for {ticker}")
@@ -720,7 +1011,12 @@ def predict_stock_price_combined_model(ticker, model, seq_length=60):
     return predicted_price[0][0]
 
 
-def generate_timeseries_plot(df, chosen_company):
+def generate_timeseries_plot(df, chosen_company, compact=False, max_points=None):
+    import plotly.graph_objects as go
+
+    # Thin long histories down to max_points; the max and min rows are kept
+    df = downsample(df, max_points)
+
     fig = go.Figure()
 
     # Add the closing price line
@@ -731,8 +1027,7 @@ def generate_timeseries_plot(df, chosen_company):
             mode="lines",
             name="Price",
             line=dict(color="green", width=2),
-            hoverinfo="text",
-            hovertext=df["Close"].apply(lambda x: f"Price: ${x:.2f}"),
+            hovertemplate="Price: $%{y:.2f}<extra></extra>",
         )
     )
 
@@ -779,16 +1074,17 @@ def generate_timeseries_plot(df, chosen_company):
     fig.update_yaxes(automargin=True)
     fig.update_xaxes(automargin=True)
 
-    graphJSON = plotly.io.to_json(fig, pretty=True)
-    return graphJSON
+    return chart_payload(fig, compact)
 
 
-def generate_monetary_charts_1d(ticker_symbol, company_name):
-    company = yf.Ticker(ticker_symbol)
-    stock_data = company.history(period="1d")
+def generate_monetary_charts_1d(snapshot, company_name, compact=False):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    stock_data = snapshot.history("1d")
 
     # Fetch stock data
-    info = company.info
+    info = snapshot.info
 
     # Create a dictionary to store data in a tabular format
     data = {
@@ -813,37 +1109,12 @@ def generate_monetary_charts_1d(ticker_symbol, company_name):
             stock_data["Close"].iloc[-1] if not stock_data.empty else "N/A",
             info.get("marketCap", "N/A"),
             info.get("trailingEps", "N/A"),
-            (
-                company.financials.loc["Gross Profit"][0]
-                if "Gross Profit" in company.financials.index
-                else "N/A"
-            ),
-            (
-                company.financials.loc["Pretax Income"][0]
-                if "Pretax Income" in company.financials.index
-                else "N/A"
-            ),
-            (
-                company.financials.loc["EBITDA"][0]
-                if "EBITDA" in company.financials.index
-                else "N/A"
-            ),
-            (
-                company.balance_sheet.loc["Total Liabilities Net Minority Interest"][0]
-                if "Total Liabilities Net Minority Interest"
-                in company.balance_sheet.index
-                else "N/A"
-            ),
-            (
-                company.balance_sheet.loc["Total Assets"][0]
-                if "Total Assets" in company.balance_sheet.index
-                else "N/A"
-            ),
-            (
-                company.cashflow.loc["End Cash Position"][0]
-                if "End Cash Position" in company.cashflow.index
-                else "N/A"
-            ),
+            _or_na(snapshot.statement_value("financials", "Gross Profit")),
+            _or_na(snapshot.statement_value("financials", "Pretax Income")),
+            _or_na(snapshot.statement_value("financials", "EBITDA")),
+            _or_na(snapshot.statement_value("balance_sheet", "Total Liabilities Net Minority Interest")),
+            _or_na(snapshot.statement_value("balance_sheet", "Total Assets")),
+            _or_na(snapshot.statement_value("cashflow", "End Cash Position")),
         ],
     }
 
@@ -962,15 +1233,13 @@ def generate_monetary_charts_1d(ticker_symbol, company_name):
     fig.update_yaxes(title_text="Value in USD", row=1, col=2)
     fig.update_yaxes(title_text="Value in USD", row=2, col=1)
 
-    graphJSON = plotly.io.to_json(fig, pretty=True)
-    return graphJSON
+    return chart_payload(fig, compact)
 
 
-def get_company_summary(ticker_symbol, choosen_company, time="1d"):
-    """Fetch and return company summary information using yfinance."""
-    company = yf.Ticker(ticker_symbol)
-    stock_data = company.history(period=str(time))
-    info = company.info
+def get_company_summary(snapshot, choosen_company, time="1d"):
+    """Build company summary information from the request's ticker snapshot."""
+    stock_data = snapshot.history(str(time))
+    info = snapshot.info
 
     summary = {
         "P/E Ratio": (
@@ -988,39 +1257,43 @@ def get_company_summary(ticker_symbol, choosen_company, time="1d"):
         "Market Cap": f'$ {info.get("marketCap", "N/A")/ 1_000_000_000:.2f} mil',
         "EPS": f'$ {info.get("trailingEps", "N/A"):.2f}',
         "Gross Profit": (
-            f'$ {company.financials.loc["Gross Profit"][0]/1_000_000_000:.2f} mil'
-            if "Gross Profit" in company.financials.index
+            f'$ {snapshot.statement_value("financials", "Gross Profit")/1_000_000_000:.2f} mil'
+            if "Gross Profit" in snapshot.financials.index
             else "N/A"
         ),
         "Pre-tax Income": (
-            f'$ {company.financials.loc["Pretax Income"][0]/1_000_000_000:.2f} mil'
-            if "Pretax Income" in company.financials.index
+            f'$ {snapshot.statement_value("financials", "Pretax Income")/1_000_000_000:.2f} mil'
+            if "Pretax Income" in snapshot.financials.index
             else "N/A"
         ),
         "EBITDA": (
-            f'$ {company.financials.loc["EBITDA"][0]/1_000_000_000:.2f} mil'
-            if "EBITDA" in company.financials.index
+            f'$ {snapshot.statement_value("financials", "EBITDA")/1_000_000_000:.2f} mil'
+            if "EBITDA" in snapshot.financials.index
             else "N/A"
         ),
         "Total Liabilities": (
-            f'$ {company.balance_sheet.loc["Total Liabilities Net Minority Interest"][0]/1_000_000_000:.2f} mil'
-            if "Total Liabilities Net Minority Interest" in company.balance_sheet.index
+            f'$ {snapshot.statement_value("balance_sheet", "Total Liabilities Net Minority Interest")/1_000_000_000:.2f} mil'
+            if "Total Liabilities Net Minority Interest" in snapshot.balance_sheet.index
             else "N/A"
         ),
         "Total Assets": (
-            f'$ {company.balance_sheet.loc["Total Assets"][0]/1_000_000_000:.2f} mil'
-            if "Total Assets" in company.balance_sheet.index
+            f'$ {snapshot.statement_value("balance_sheet", "Total Assets")/1_000_000_000:.2f} mil'
+            if "Total Assets" in snapshot.balance_sheet.index
             else "N/A"
         ),
         "End Cash Position": (
-            f'$ {company.cashflow.loc["End Cash Position"][0]/1_000_000_000:.2f} mil'
-            if "End Cash Position" in company.cashflow.index
+            f'$ {snapshot.statement_value("cashflow", "End Cash Position")/1_000_000_000:.2f} mil'
+            if "End Cash Position" in snapshot.cashflow.index
             else "N/A"
         ),
     }
     return summary
 
 
+def _or_na(value):
+    return "N/A" if value is None else value
+
+
 def format_value(val):
     if isinstance(val, (int, float)):
         return f"{val:,.2f}"
@@ -1030,4 +1303,5 @@ def format_value(val):
 
 
 if __name__ == "__main__":
+    # Development server; serve.py runs the multi-worker production server
     app.run(debug=True)
@@ -0,0 +1,97 @@
+"""Fit and forecast every S&P 500 constituent after market close.
+
+Writes forecasts.npz, which generate_arima_forecast_timeseries serves from
+while it is fresh, and reports throughput and per-ticker fit times (the
+price history fetch is timed separately):
+
+    python batch_forecast.py --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# One BLAS thread per worker process; the parallelism comes from the pool
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import numpy as np
+
+from forecast_jobs import run_forecast
+from forecasting import BATCH_FORECAST_PATH, N_PERIODS
+
+
+def run_batch(tickers, workers, output=BATCH_FORECAST_PATH):
+    started = time.perf_counter()
+    results = {}
+    failures = {}
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {executor.submit(run_forecast, ticker): ticker for ticker in tickers}
+        for done, future in enumerate(as_completed(futures), start=1):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                failures[ticker] = str(e)
+            if done % 25 == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(tickers)} tickers, {done / elapsed:.2f} tickers/s")
+
+    elapsed = time.perf_counter() - started
+    ordered = [results[t] for t in tickers if t in results]
+    if ordered:
+        write_artifact(ordered, output)
+
+    fit_seconds = np.array([r["fit_seconds"] for r in ordered])
+    fetch_seconds = np.array([r["fetch_seconds"] for r in ordered])
+    print(f"\nForecast {len(ordered)} tickers ({len(failures)} failed) "
+          f"in {elapsed:.1f}s with {workers} workers: {len(tickers) / elapsed:.2f} tickers/s")
+    if len(fit_seconds):
+        p50, p90, p99 = np.percentile(fit_seconds, [50, 90, 99])
+        print(f"Per-ticker fit time: p50 {p50:.2f}s, p90 {p90:.2f}s, p99 {p99:.2f}s, "
+              f"max {fit_seconds.max():.2f}s, total {fit_seconds.sum():.1f}s CPU")
+        slowest = sorted(ordered, key=lambda r: r["fit_seconds"], reverse=True)[:10]
+        print("Slowest: " + ", ".join(f"{r['ticker']} {r['fit_seconds']:.2f}s" for r in slowest))
+        p50, p90 = np.percentile(fetch_seconds, [50, 90])
+        print(f"Per-ticker history fetch: p50 {p50:.2f}s, p90 {p90:.2f}s, "
+              f"max {fetch_seconds.max():.2f}s, total {fetch_seconds.sum():.1f}s")
+    for ticker, error in failures.items():
+        print(f"Failed {ticker}: {error}")
+
+    return results, failures
+
+
+def write_artifact(results, output):
+    tmp_path = f"{output}.tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        tickers=np.array([r["ticker"] for r in results]),
+        last_dates=np.array([r["last_date"] for r in results]),
+        forecast=np.array([r["forecast"] for r in results], dtype=np.float32),
+        lower=np.array([r["lower"] for r in results], dtype=np.float32),
+        upper=np.array([r["upper"] for r in results], dtype=np.float32),
+        fit_seconds=np.array([r["fit_seconds"] for r in results], dtype=np.float32),
+        fetch_seconds=np.array([r["fetch_seconds"] for r in results], dtype=np.float32),
+        n_periods=np.array(N_PERIODS),
+        generated_at=np.array(time.time()),
+    )
+    os.replace(tmp_path, output)
+    print(f"Wrote {len(results)} forecasts to {output} ({os.path.getsize(output) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=BATCH_FORECAST_PATH)
+    parser.add_argument("--limit", type=int, help="only the first N tickers")
+    args = parser.parse_args()
+
+    with open("./sp500_tickers.json", "r") as file:
+        tickers = list(json.load(file))[: args.limit]
+
+    run_batch(tickers, args.workers, args.output)
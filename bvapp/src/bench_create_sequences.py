@@ -0,0 +1,68 @@
+"""Benchmark lstm.create_sequences against the previous list-of-slices version.
+
+Runs both over a synthetic universe shaped like the training set (~500
+tickers x ~3,700 daily closes) and keeps every ticker's output alive, the
+way prepare_combined_data does, so the peak memory reflects a full run:
+
+    python bench_create_sequences.py --tickers 500 --days 3700
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from lstm import create_sequences
+
+
+def create_sequences_copying(data, seq_length):
+    # The implementation create_sequences replaced
+    sequences = []
+    labels = []
+    for i in range(len(data) - seq_length):
+        sequences.append(data[i:i + seq_length])
+        labels.append(data[i + seq_length])
+    return np.array(sequences), np.array(labels)
+
+
+def run(build, universe, seq_length):
+    tracemalloc.start()
+    started = time.perf_counter()
+    outputs = [build(prices, seq_length) for prices in universe]
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return outputs, elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--days", type=int, default=3700)
+    parser.add_argument("--seq-length", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    universe = [rng.random((args.days, 1)) for _ in range(args.tickers)]
+
+    strided, strided_time, strided_peak = run(create_sequences, universe, args.seq_length)
+    strided32, strided32_time, strided32_peak = run(
+        lambda data, n: create_sequences(data, n, dtype=np.float32), universe, args.seq_length
+    )
+    copying, copying_time, copying_peak = run(create_sequences_copying, universe, args.seq_length)
+
+    for (x_new, y_new), (x_old, y_old) in zip(strided, copying):
+        assert x_new.shape == x_old.shape and np.array_equal(x_new, x_old)
+        assert y_new.shape == y_old.shape and np.array_equal(y_new, y_old)
+
+    windows = sum(len(x) for x, _ in strided)
+    print(f"{args.tickers} tickers x {args.days} days, seq_length {args.seq_length}: {windows:,} windows")
+    print(f"{'implementation':<24}{'time':>10}{'peak memory':>16}")
+    for name, elapsed, peak in [
+        ("list of slices", copying_time, copying_peak),
+        ("strided view", strided_time, strided_peak),
+        ("strided view, float32", strided32_time, strided32_peak),
+    ]:
+        print(f"{name:<24}{elapsed:>9.3f}s{peak / 2**20:>13.1f} MiB")
+    print(f"Speed-up {copying_time / strided_time:.0f}x, "
+          f"memory {copying_peak / max(strided_peak, 1):.0f}x smaller; outputs identical")
@@ -0,0 +1,55 @@
+"""Benchmark Monte Carlo DCF throughput on one core and across all cores.
+
+Uses a synthetic large-cap company so it runs without network access:
+
+    python bench_monte_carlo.py --paths 2000000
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from monte_carlo import fit_distributions, simulate, summarize
+
+inputs = {
+    "last_ebitda": 130e9,
+    "last_fcf": 110e9,
+    "growth_rates": [0.04, 0.07, 0.02, 0.06],
+    "avg_growth_rate": 0.0475,
+    "beta": 1.2,
+    "total_debt": 90e9,
+    "interest_expense": -3e9,
+    "cost_of_debt_history": [0.033, 0.032, 0.030, 0.029],
+    "tax_rate": 0.16,
+    "market_cap": 3e12,
+    "depreciation": 11e9,
+    "cash_and_equiv": 30e9,
+    "shares_outstanding": 15e9,
+}
+
+
+def run(paths, workers):
+    distributions = fit_distributions(inputs)
+    started = time.perf_counter()
+    values = simulate(inputs, distributions, paths=paths, seed=42, workers=workers)
+    elapsed = time.perf_counter() - started
+    return values, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", type=int, default=2_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    single, single_time = run(args.paths, 1)
+    multi, multi_time = run(args.paths, args.workers)
+    assert np.array_equal(single, multi, equal_nan=True), "results depend on worker count"
+
+    print(f"{args.paths:,} paths, seed 42")
+    print(f"{'1 core':<12}{single_time:6.2f}s {args.paths / single_time:>12,.0f} paths/s")
+    print(f"{f'{args.workers} workers':<12}{multi_time:6.2f}s {args.paths / multi_time:>12,.0f} paths/s "
+          "(includes process start-up)")
+    p = summarize(single)["percentiles"]
+    print(f"Equity value per share p5 {p['p5']:.2f}, p50 {p['p50']:.2f}, p95 {p['p95']:.2f}")
@@ -0,0 +1,72 @@
+"""Compare /api/stock-data chart payload sizes: default, compact and downsampled.
+
+Builds the price, forecast and industry charts with the app's own builders
+from a synthetic large-cap (a daily history, 10 years by default, and an
+IT-sector peer table), so it runs without network access:
+
+    python bench_payload.py --days 10000 --max-points 1000
+"""
+import argparse
+import gzip
+import json
+import os
+
+os.environ.setdefault("BV_MODEL_WARMUP", "0")
+os.environ.setdefault("BV_FUNDAMENTALS_CACHE", "")
+
+import numpy as np
+import pandas as pd
+
+import app
+from compression import brotli
+
+
+def synthetic_history(days=2520, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2024-01-01", periods=days)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.015, days)))
+    return pd.DataFrame({"Close": close}, index=dates)
+
+
+def build_charts(history, compact, max_points=None):
+    sector = "Information Technology"
+    forecast = history["Close"].iloc[-1] * (1 + np.linspace(0, 0.02, app.N_PERIODS))
+    conf_int = np.column_stack([forecast * 0.95, forecast * 1.05])
+    return {
+        "plot": app.generate_timeseries_plot(history, "Apple Inc.", compact, max_points),
+        "forecast_plot": app.generate_forecast_plot("AAPL", history, forecast, conf_int, compact, max_points),
+        "industry_plot": app.generate_industry_plot(sector, "AAPL", compact),
+    }
+
+
+def sizes(payload):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    row = {"raw": len(body), "gzip": len(gzip.compress(body, 6))}
+    if brotli is not None:
+        row["br"] = len(brotli.compress(body, quality=5))
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=2520, help="trading days of history")
+    parser.add_argument("--max-points", type=int, default=1000, help="downsampling budget")
+    args = parser.parse_args()
+
+    peers = app.sector_fundamentals.sector_index["Information Technology"]
+    rng = np.random.default_rng(1)
+    app.sector_fundamentals._table = {
+        ticker: {"trailingPE": float(rng.uniform(10, 60)), "marketCap": 1e11} for ticker, _ in peers
+    }
+
+    history = synthetic_history(args.days)
+    results = {
+        "default": sizes(build_charts(history, compact=False)),
+        "compact": sizes(build_charts(history, compact=True)),
+        f"{args.max_points} pts": sizes(build_charts(history, compact=True, max_points=args.max_points)),
+    }
+
+    columns = list(results["default"])
+    print(f"{'mode':<12}" + "".join(f"{c:>12}" for c in columns))
+    for mode, row in results.items():
+        print(f"{mode:<12}" + "".join(f"{row[c] / 1024:>10.1f}KB" for c in columns))
@@ -0,0 +1,65 @@
+"""Measure app startup: cold import time of each heavy dependency and of app.py.
+
+Every import runs in a fresh interpreter, so each number is what that module
+would add to a worker boot on its own (shared dependencies included):
+
+    python bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+modules = [
+    "flask",
+    "numpy",
+    "pandas",
+    "yfinance",
+    "requests",
+    "plotly.graph_objects",
+    "statsmodels.api",
+    "pmdarima",
+    "sklearn.preprocessing",
+    "matplotlib.pyplot",
+    "keras",
+]
+
+SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+APP_SNIPPET = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+app.model_ready.wait()
+print(imported, time.perf_counter() - started, app.model_state["error"] or "")
+"""
+
+
+def run(snippet, env=None):
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().splitlines()[-1]
+
+
+if __name__ == "__main__":
+    print(f"{'module':<24}{'import time':>12}")
+    for module in modules:
+        output = run(SNIPPET.format(module=module))
+        timing = f"{float(output):>11.2f}s" if output else f"{'not installed':>12}"
+        print(f"{module:<24}{timing}")
+
+    output = run(APP_SNIPPET, env={**os.environ, "BV_FUNDAMENTALS_CACHE": ""})
+    if output is None:
+        print("app failed to import")
+    else:
+        imported, ready, error = (output.split(" ", 2) + [""])[:3]
+        print(f"{'app':<24}{float(imported):>11.2f}s")
+        print(f"{'app + model warm-up':<24}{float(ready):>11.2f}s {error}".rstrip())
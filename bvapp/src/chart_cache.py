@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+CHART_CACHE_ENTRIES = int(os.environ.get("BV_CHART_CACHE_ENTRIES", 512))
+# Plotly payloads run to hundreds of KB, so the entry count alone doesn't bound
+# memory. This is per process: every serve.py worker holds its own cache.
+CHART_CACHE_BYTES = int(os.environ.get("BV_CHART_CACHE_BYTES", 64 * 1024 * 1024))
+# While the market is open, periods that end on today's bar are only reused briefly
+INTRADAY_TTL_SECONDS = float(os.environ.get("BV_CHART_INTRADAY_TTL_SECONDS", 60))
+
+# NYSE regular session; holidays just mean an entry expires a day early
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+intraday_periods = {"1d", "5d"}
+
+CacheEntry = namedtuple("CacheEntry", ["payload", "etag", "expires_at", "size"])
+
+
+def _session_time(day, hour_minute):
+    return day.replace(hour=hour_minute[0], minute=hour_minute[1], second=0, microsecond=0)
+
+
+def is_market_open(now=None):
+    now = datetime.fromtimestamp(now or time.time(), EXCHANGE_TZ)
+    return now.weekday() < 5 and _session_time(now, MARKET_OPEN) <= now < _session_time(now, MARKET_CLOSE)
+
+
+def next_market_close(now=None):
+    """Timestamp of the next weekday 16:00 New York close after now."""
+    now = datetime.fromtimestamp(now or time.time(), EXCHANGE_TZ)
+    close = _session_time(now, MARKET_CLOSE)
+    if close <= now:
+        close += timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return close.timestamp()
+
+
+def expires_at(period, now=None):
+    """When a payload built now for period may be out of date.
+
+    Daily bars only change at the close, so most periods last until the next
+    one. Intraday periods also follow the live quote while the market is open.
+    """
+    now = now or time.time()
+    close = next_market_close(now)
+    if period in intraday_periods and is_market_open(now):
+        return min(now + INTRADAY_TTL_SECONDS, close)
+    return close
+
+
+def _encode(payload):
+    body = payload if isinstance(payload, str) else json.dumps(payload, sort_keys=True)
+    return body.encode()
+
+
+class ChartCache:
+    """LRU cache of built chart and summary payloads.
+
+    Keys name everything a payload depends on: section, ticker, period, the
+    as-of date of the data and any rendering options. Each entry carries a
+    strong ETag of its payload and expires on the exchange calendar. The
+    cache is bounded by both its entry count and the encoded size of its
+    payloads.
+    """
+
+    def __init__(self, max_entries=CHART_CACHE_ENTRIES, max_bytes=CHART_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def put(self, key, payload, expires):
+        body = _encode(payload)
+        entry = CacheEntry(payload, hashlib.sha1(body).hexdigest(), expires, len(body))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            # An entry bigger than the whole budget is still returned, just not kept
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def get_or_build(self, key, build, period):
+        # Built outside the lock; two requests missing together both build
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, build(), expires_at(period))
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,58 @@
+import base64
+import json
+
+import numpy as np
+
+
+# Trace arrays shorter than this stay plain JSON lists
+MIN_TYPED_LENGTH = 8
+# How plotly writes a timestamp at midnight, depending on its version
+midnight_suffixes = ("T00:00:00.000000", "T00:00:00")
+
+
+def typed_array(values, dtype=np.float32):
+    """Plotly.js typed-array spec ({"dtype", "bdata"}) for a 1-D array."""
+    array = np.ascontiguousarray(values, dtype=dtype)
+    return {"dtype": array.dtype.str[1:], "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compact_array(value):
+    # float64 (whether already base64 or a plain list) becomes base64 float32,
+    # which is plenty for prices and ratios
+    if isinstance(value, dict) and value.get("dtype") == "f8" and "bdata" in value and "shape" not in value:
+        return typed_array(np.frombuffer(base64.b64decode(value["bdata"]), dtype="<f8"))
+    if not isinstance(value, list) or len(value) < MIN_TYPED_LENGTH:
+        return value
+    if all(_is_number(v) for v in value):
+        return typed_array(value)
+    # Daily timestamps don't need their time of day
+    for suffix in midnight_suffixes:
+        if all(isinstance(v, str) and v.endswith(suffix) for v in value):
+            return [v[:-len(suffix)] for v in value]
+    return value
+
+
+def compact_figure(figure):
+    """Shrink the arrays of a figure dict (as from plotly.io.to_json) in place."""
+    for trace in figure.get("data", []):
+        for key, value in trace.items():
+            trace[key] = _compact_array(value)
+    return figure
+
+
+def chart_payload(fig, compact=False):
+    """How a chart goes into a JSON response.
+
+    By default it is the pretty-printed JSON string the frontend parses with
+    JSON.parse. In compact mode it is the figure itself, embedded as an object
+    (so it isn't encoded twice), with typed arrays for the numeric data.
+    """
+    import plotly.io
+
+    if not compact:
+        return plotly.io.to_json(fig, pretty=True)
+    return compact_figure(json.loads(plotly.io.to_json(fig)))
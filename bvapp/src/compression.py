@@ -0,0 +1,64 @@
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+COMPRESS_MIN_BYTES = int(os.environ.get("BV_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("BV_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BV_BROTLI_QUALITY", 5))
+
+compressible_types = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+
+
+def choose_encoding(accept_encoding):
+    """Best encoding the client accepts: brotli if available, then gzip."""
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress_response(response, accept_encoding):
+    """Compress a buffered response body in place when it's worth it.
+
+    Streamed responses are left alone, since compressing them would mean
+    buffering the stream.
+    """
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in compressible_types
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encoding or "")
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed bytes differ from the identity ones, so a strong ETag
+    # no longer describes them
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
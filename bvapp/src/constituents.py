@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from refresh_lock import RefreshLock, file_version
+
+WIKIPEDIA_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+SHIPPED_PATH = "./sp500_tickers.json"
+CACHE_PATH = os.environ.get("BV_CONSTITUENTS_CACHE", "sp500_constituents.json")
+REFRESH_SECONDS = float(os.environ.get("BV_CONSTITUENTS_REFRESH_SECONDS", 24 * 60 * 60))
+RETRY_SECONDS = float(os.environ.get("BV_CONSTITUENTS_RETRY_SECONDS", 15 * 60))
+# How often processes that don't hold the refresh lock look for a new cache file
+RELOAD_SECONDS = float(os.environ.get("BV_CONSTITUENTS_RELOAD_SECONDS", 60))
+
+# A scrape with far fewer rows than the index has means the page changed
+# shape, not that the index shrank
+MIN_CONSTITUENTS = 400
+
+
+def fetch_constituents(url=WIKIPEDIA_URL):
+    """{symbol: {"GICS Sector": ..., "Security": ...}} scraped from Wikipedia."""
+    import pandas as pd
+
+    df = pd.read_html(url)[0]  # The first table contains the S&P 500 data
+    df = df[["Symbol", "GICS Sector", "Security"]]
+    return df.set_index("Symbol")[["GICS Sector", "Security"]].to_dict(orient="index")
+
+
+class ConstituentTable:
+    """The S&P 500 constituents, served from memory and refreshed in the background.
+
+    Starts from the last refreshed copy (cache_path) or the shipped
+    sp500_tickers.json. The data, its serialized body and its ETag are swapped
+    together as one tuple, so a reader never pairs a new body with an old ETag.
+    on_change callbacks run with the new data after every change.
+
+    Of the processes sharing cache_path, only the one holding its refresh
+    lock scrapes Wikipedia; the others pick up the file it writes.
+    """
+
+    def __init__(self, shipped_path=SHIPPED_PATH, cache_path=CACHE_PATH,
+                 refresh_seconds=REFRESH_SECONDS, retry_seconds=RETRY_SECONDS):
+        self.cache_path = cache_path
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self.refreshed_at = None
+        self.on_change = []
+        self._thread = None
+        self._refresh_lock = RefreshLock(cache_path)
+        self._version = None
+
+        data = self._load_cache()
+        if data is not None:
+            self.refreshed_at = os.path.getmtime(cache_path)
+        else:
+            with open(shipped_path, "r") as file:
+                data = json.load(file)
+        self._state = self._build(data)
+
+    @staticmethod
+    def _build(data):
+        body = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+        return data, body, hashlib.sha1(body).hexdigest()
+
+    @property
+    def data(self):
+        return self._state[0]
+
+    def snapshot(self):
+        """(data, body, etag) of one consistent version."""
+        return self._state
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            version = file_version(self.cache_path)
+            with open(self.cache_path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable constituents cache: {e}")
+            return None
+        self._version = version
+        return data
+
+    def _save_cache(self, body):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(body)
+        os.replace(tmp_path, self.cache_path)
+        self._version = file_version(self.cache_path)
+
+    def _apply(self, data, state=None):
+        self._state = state or self._build(data)
+        for callback in self.on_change:
+            callback(data)
+
+    def reload(self):
+        """Pick up a cache file written by the process holding the refresh
+        lock; returns True if the constituents changed."""
+        if file_version(self.cache_path) == self._version:
+            return False
+        data = self._load_cache()
+        if data is None or data == self.data:
+            return False
+        print(f"Loaded {len(data)} S&P 500 constituents refreshed by another process")
+        self._apply(data)
+        return True
+
+    def refresh(self):
+        """Re-scrape the constituents; returns True if they changed."""
+        fetched = fetch_constituents()
+        if len(fetched) < MIN_CONSTITUENTS:
+            raise ValueError(f"Only {len(fetched)} constituents scraped")
+        self.refreshed_at = time.time()
+
+        current = self.data
+        if fetched == current:
+            return False
+        added = sorted(set(fetched) - set(current))
+        removed = sorted(set(current) - set(fetched))
+        print(f"S&P 500 constituents changed: added {added}, removed {removed}")
+
+        state = self._build(fetched)
+        self._save_cache(state[1])
+        self._apply(fetched, state)
+        return True
+
+    def _run(self):
+        while True:
+            if not self._refresh_lock.acquire():
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Constituents reload failed: {e}")
+                time.sleep(RELOAD_SECONDS)
+                continue
+
+            wait = self.refresh_seconds
+            if self.refreshed_at is None or time.time() - self.refreshed_at >= self.refresh_seconds:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Constituents refresh failed: {e}")
+                    wait = self.retry_seconds
+            else:
+                wait = self.refresh_seconds - (time.time() - self.refreshed_at)
+            time.sleep(max(wait, 1))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="constituents", daemon=True)
+            self._thread.start()
@@ -0,0 +1,272 @@
+import numpy as np
+
+
+# Assumptions of the DCF behind /api/stock-valuation
+RISK_FREE_RATE = 0.02  # 2% risk-free rate
+MARKET_RETURN = 0.08  # 8% expected market return
+DEFAULT_GROWTH_RATE = 0.05  # used when EBITDA history gives no usable growth
+DEFAULT_COST_OF_EQUITY = 0.08
+DEFAULT_TAX_RATE = 0.21
+TERMINAL_GROWTH_RATE = 0.025
+FORECAST_YEARS = 5
+
+possible_operating_cf_keys = [
+    "Total Cash From Operating Activities",
+    "Net Cash Provided by Operating Activities",
+    "Operating Cash Flow",
+    "Cash from Operating Activities",
+]
+
+possible_capex_keys = [
+    "Capital Expenditures",
+    "Investment in Property, Plant and Equipment",
+    "Purchases of Property and Equipment",
+    "Capital Expenditure",
+]
+
+# Per-company figures that stack_inputs() turns into one array per field
+numeric_inputs = (
+    "last_ebitda",
+    "last_fcf",
+    "avg_growth_rate",
+    "beta",
+    "total_debt",
+    "interest_expense",
+    "tax_rate",
+    "market_cap",
+    "depreciation",
+    "cash_and_equiv",
+    "shares_outstanding",
+)
+
+
+class ValuationError(Exception):
+    """A company can't be valued; the message is shown to the user."""
+
+
+def _first_row(df, possible_keys):
+    for key in possible_keys:
+        if key in df.index:
+            return df.loc[key]
+    return None
+
+
+def _latest(df, key, default=None):
+    # Most recent value of a statement line (yfinance lists newest first)
+    if key in df.index:
+        return df.loc[key].iloc[0]
+    if default is None:
+        raise KeyError(key)
+    return default
+
+
+def valuation_inputs(info, income_stmt, cash_flow, balance_sheet):
+    """Pull everything the DCF needs out of a company's info and statements.
+
+    Raises ValuationError when a required figure is missing or unusable.
+    """
+    if income_stmt.empty or cash_flow.empty or balance_sheet.empty:
+        raise ValuationError("Financial data not available for this ticker.")
+
+    operating_cf = _first_row(cash_flow, possible_operating_cf_keys)
+    capex = _first_row(cash_flow, possible_capex_keys)
+    if operating_cf is None or capex is None:
+        raise ValuationError("Necessary financial data not found in cash flow statement.")
+
+    if "EBITDA" not in income_stmt.index:
+        raise ValuationError("EBITDA data not available.")
+    ebitda_values = income_stmt.loc["EBITDA"].sort_index(ascending=True).values
+    if ebitda_values[-1] <= 0 or np.isnan(ebitda_values[-1]):
+        raise ValuationError("EBITDA data is invalid or non-positive.")
+
+    fcf_values = (operating_cf - capex).sort_index(ascending=True).values
+    if len(fcf_values) < 2:
+        raise ValuationError("Not enough data to perform DCF.")
+
+    # Historical EBITDA growth rates
+    previous = ebitda_values[:-1]
+    valid = previous != 0
+    growth_rates = (ebitda_values[1:][valid] - previous[valid]) / np.abs(previous[valid])
+    avg_growth_rate = np.mean(growth_rates) if len(growth_rates) else DEFAULT_GROWTH_RATE
+    if np.isnan(avg_growth_rate) or np.isinf(avg_growth_rate):
+        avg_growth_rate = DEFAULT_GROWTH_RATE
+
+    beta = info.get("beta", 1.0)
+    if beta is None or np.isnan(beta):
+        beta = 1.0
+
+    try:
+        total_debt = balance_sheet.loc["Long Term Debt"].iloc[0]
+    except KeyError:
+        raise ValuationError("Long term debt data not available.")
+    interest_expense = _latest(income_stmt, "Interest Expense", 0)
+
+    try:
+        tax_rate = _latest(income_stmt, "Income Tax Expense") / _latest(income_stmt, "Income Before Tax")
+    except KeyError:
+        tax_rate = DEFAULT_TAX_RATE
+
+    market_cap = info.get("marketCap", 0) or 0
+    if market_cap + total_debt == 0:
+        raise ValuationError("Market capitalization or total debt data not available.")
+
+    try:
+        cash_and_equiv = _latest(balance_sheet, "Cash") + _latest(balance_sheet, "Short Term Investments")
+    except KeyError:
+        cash_and_equiv = _latest(balance_sheet, "Cash", 0)
+
+    shares_outstanding = info.get("sharesOutstanding", 0) or 0
+    if shares_outstanding == 0:
+        raise ValuationError("Shares outstanding not available.")
+
+    # Yearly cost of debt over the reported years, for the simulation mode
+    if "Interest Expense" in income_stmt.index:
+        yearly = (income_stmt.loc["Interest Expense"].abs() / balance_sheet.loc["Long Term Debt"]).dropna()
+        cost_of_debt_history = [float(r) for r in yearly.values if np.isfinite(r) and r > 0]
+    else:
+        cost_of_debt_history = []
+
+    return {
+        "company": info.get("shortName", "Unknown"),
+        "sector": info.get("sector", "Unknown"),
+        "last_ebitda": float(ebitda_values[-1]),
+        "last_fcf": float(fcf_values[-1]),
+        "growth_rates": [float(g) for g in growth_rates],
+        "avg_growth_rate": float(avg_growth_rate),
+        "beta": float(beta),
+        "total_debt": float(total_debt),
+        "interest_expense": float(interest_expense),
+        "cost_of_debt_history": cost_of_debt_history,
+        "tax_rate": float(tax_rate),
+        "market_cap": float(market_cap),
+        "depreciation": float(_latest(income_stmt, "Depreciation", 0)),
+        "cash_and_equiv": float(cash_and_equiv),
+        "shares_outstanding": float(shares_outstanding),
+    }
+
+
+def stack_inputs(inputs_list):
+    """Stack the valuation_inputs() of several companies into one array per
+    field, so the functions below value all of them in a single pass."""
+    return {
+        key: np.array([inputs[key] for inputs in inputs_list], dtype=np.float64)
+        for key in numeric_inputs
+    }
+
+
+def cost_of_equity(beta, risk_free_rate=RISK_FREE_RATE, market_return=MARKET_RETURN):
+    # CAPM, falling back to the default where it is unusable
+    rate = risk_free_rate + np.asarray(beta, dtype=np.float64) * (market_return - risk_free_rate)
+    return np.where(np.isnan(rate) | (rate <= 0), DEFAULT_COST_OF_EQUITY, rate)
+
+
+def cost_of_debt(interest_expense, total_debt):
+    interest_expense, total_debt = np.broadcast_arrays(
+        np.asarray(interest_expense, dtype=np.float64), np.asarray(total_debt, dtype=np.float64)
+    )
+    rate = np.zeros(total_debt.shape)
+    positive = total_debt > 0
+    rate[positive] = np.abs(interest_expense[positive]) / total_debt[positive]
+    return rate[()]
+
+
+def wacc(market_cap, total_debt, equity_rate, debt_rate, tax_rate):
+    total_value = market_cap + total_debt
+    return (market_cap / total_value) * equity_rate + (total_debt / total_value) * debt_rate * (1 - tax_rate)
+
+
+def present_value(base, growth, discount_rate, terminal_growth, years, offset=0.0, multiplier=1.0):
+    """Discounted value of a cash flow projected for `years` years plus its
+    Gordon-growth terminal value.
+
+    The cash flow in year t is (base * (1 + growth)**t - offset) * multiplier.
+    Every argument may be a scalar or an array; they are broadcast against
+    each other, so one call values a whole grid of assumptions (or a batch
+    of companies). Cells where discount_rate <= terminal_growth are NaN.
+    """
+    base, growth, discount_rate, terminal_growth, years, offset, multiplier = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in
+          (base, growth, discount_rate, terminal_growth, years, offset, multiplier))
+    )
+    horizon = int(years.max()) if years.size else 0
+    t = np.arange(1, horizon + 1, dtype=np.float64)
+
+    def expand(a):
+        return a[..., None]
+
+    cash = (expand(base) * (1 + expand(growth)) ** t - expand(offset)) * expand(multiplier)
+    discounted = np.where(t <= expand(years), cash / (1 + expand(discount_rate)) ** t, 0.0)
+
+    final_cash = (base * (1 + growth) ** years - offset) * multiplier
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terminal = final_cash * (1 + terminal_growth) / (discount_rate - terminal_growth)
+        terminal = np.where(discount_rate > terminal_growth, terminal, np.nan)
+    terminal_pv = terminal / (1 + discount_rate) ** years
+    return (discounted.sum(axis=-1) + terminal_pv)[()]
+
+
+def dcf_values(inputs, growth, discount_rate, terminal_growth=TERMINAL_GROWTH_RATE,
+               years=FORECAST_YEARS):
+    """Enterprise, equity and FCF-based DCF values for broadcastable assumptions.
+
+    Enterprise value discounts projected NOPAT (EBITDA less constant D&A,
+    after tax); the DCF value discounts projected free cash flow.
+    """
+    enterprise_value = present_value(
+        inputs["last_ebitda"], growth, discount_rate, terminal_growth, years,
+        offset=inputs["depreciation"], multiplier=1 - inputs["tax_rate"],
+    )
+    dcf_value = present_value(inputs["last_fcf"], growth, discount_rate, terminal_growth, years)
+    net_debt = inputs["total_debt"] - inputs["cash_and_equiv"]
+    equity_value = enterprise_value - net_debt
+    return {
+        "enterprise_value": enterprise_value,
+        "net_debt": net_debt,
+        "equity_value": equity_value,
+        "equity_value_per_share": equity_value / inputs["shares_outstanding"],
+        "dcf_value": dcf_value,
+    }
+
+
+def sensitivity_grid(inputs, discount_rate, steps=21, wacc_range=0.02,
+                     terminal_growth=TERMINAL_GROWTH_RATE, terminal_growth_range=0.015,
+                     years=FORECAST_YEARS):
+    """steps x steps grid of values over WACC (rows) and terminal growth
+    (columns), centred on the base case and computed in one pass."""
+    wacc_axis = np.linspace(discount_rate - wacc_range, discount_rate + wacc_range, steps)
+    growth_axis = np.linspace(terminal_growth - terminal_growth_range,
+                              terminal_growth + terminal_growth_range, steps)
+    values = dcf_values(inputs, inputs["avg_growth_rate"], wacc_axis[:, None],
+                        growth_axis[None, :], years)
+    return wacc_axis, growth_axis, values
+
+
+def base_discount_rate(inputs, terminal_growth=TERMINAL_GROWTH_RATE):
+    """The company's WACC, kept slightly above the terminal growth rate."""
+    rate = float(wacc(
+        inputs["market_cap"],
+        inputs["total_debt"],
+        cost_of_equity(inputs["beta"]),
+        cost_of_debt(inputs["interest_expense"], inputs["total_debt"]),
+        inputs["tax_rate"],
+    ))
+    if np.isnan(rate) or rate <= 0:
+        raise ValuationError("MACC Calculation invalid")
+    if rate <= terminal_growth:
+        print("WACC is less than or equal to terminal growth rate. Adjusting WACC.")
+        rate = terminal_growth + 0.01  # Set WACC slightly above terminal growth rate
+    return rate
+
+
+def discount_rates(inputs, terminal_growth=TERMINAL_GROWTH_RATE):
+    """base_discount_rate() for stacked inputs: NaN where WACC is invalid
+    instead of raising, so one bad company doesn't sink the batch."""
+    rate = wacc(
+        inputs["market_cap"],
+        inputs["total_debt"],
+        cost_of_equity(inputs["beta"]),
+        cost_of_debt(inputs["interest_expense"], inputs["total_debt"]),
+        inputs["tax_rate"],
+    )
+    rate = np.where(np.isnan(rate) | (rate <= 0), np.nan, rate)
+    return np.where(rate <= terminal_growth, terminal_growth + 0.01, rate)
@@ -0,0 +1,336 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+
+from forecasting import ARIMA_END, ARIMA_START, arima_forecast
+from price_store import get_store
+
+
+FORECAST_WORKERS = int(os.environ.get("BV_FORECAST_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+FORECAST_QUEUE_DEPTH = int(os.environ.get("BV_FORECAST_QUEUE_DEPTH", 32))
+
+# Jobs are shared through SQLite, so every web process sees every job. Only
+# one process should run the dispatcher (and its pool): serve.py turns it off
+# in the web workers and runs it in a process of its own.
+JOBS_DB_PATH = os.environ.get("BV_FORECAST_JOBS_DB", "forecast_jobs.sqlite")
+FORECAST_DISPATCH = os.environ.get("BV_FORECAST_DISPATCH", "1") != "0"
+POLL_SECONDS = float(os.environ.get("BV_FORECAST_POLL_SECONDS", 0.5))
+
+# A fit running longer than this is failed and its pool worker killed
+JOB_TIMEOUT_SECONDS = float(os.environ.get("BV_FORECAST_JOB_TIMEOUT", 10 * 60))
+
+# Finished jobs are kept this long so clients can collect the result
+JOB_TTL_SECONDS = float(os.environ.get("BV_FORECAST_JOB_TTL", 60 * 60))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_jobs (
+    id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    finished_at REAL,
+    claimed_by INTEGER,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS forecast_jobs_status ON forecast_jobs (status, ticker);
+"""
+
+JOB_COLUMNS = ["id", "ticker", "status", "submitted_at", "finished_at", "result", "error"]
+
+
+class QueueFull(Exception):
+    pass
+
+
+def run_forecast(ticker):
+    """Fit and forecast one ticker; runs in a worker process."""
+    started = time.perf_counter()
+    close = get_store().get_history(ticker, start=ARIMA_START, end=ARIMA_END)["Close"]
+    if close.empty:
+        raise ValueError(f"No price history for {ticker}")
+    fetched = time.perf_counter()
+
+    forecast, conf_int = arima_forecast(ticker, close)
+    return {
+        "ticker": ticker,
+        "last_date": close.index[-1].strftime("%Y-%m-%d"),
+        "forecast": forecast.tolist(),
+        "lower": conf_int[:, 0].tolist(),
+        "upper": conf_int[:, 1].tolist(),
+        "fetch_seconds": fetched - started,
+        "fit_seconds": time.perf_counter() - fetched,
+    }
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ForecastJobs:
+    """ARIMA forecast jobs, queued in SQLite and run in a process pool so
+    they never hold a web process's GIL.
+
+    Any process can submit() and get() jobs; the dispatcher (run()) claims
+    pending jobs and runs them. A ticker has at most one job in flight;
+    submitting it again returns the existing job.
+    """
+
+    def __init__(self, path=JOBS_DB_PATH, workers=FORECAST_WORKERS,
+                 queue_depth=FORECAST_QUEUE_DEPTH, dispatch=FORECAST_DISPATCH):
+        self.path = path
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.dispatch = dispatch
+        self._executor = None
+        self._pool_broken = False
+        # job id -> [ticker, future, monotonic time it started running]
+        self._running = {}
+        self._running_lock = threading.Lock()
+        self._local = threading.local()
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so the checks made
+        # inside hold until the commit, across processes too
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _job(self, conn, job_id):
+        row = conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM forecast_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        if job["result"] is not None:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def submit(self, ticker):
+        if self.dispatch:
+            self.start()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM forecast_jobs WHERE ticker = ? AND status IN ('pending', 'running')",
+                (ticker,),
+            ).fetchone()
+            if row is not None:
+                return self._job(conn, row[0])
+
+            (in_flight,) = conn.execute(
+                "SELECT COUNT(*) FROM forecast_jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()
+            if in_flight >= self.queue_depth:
+                raise QueueFull(f"{in_flight} forecasts already queued")
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO forecast_jobs (id, ticker, status, submitted_at) VALUES (?, ?, 'pending', ?)",
+                (job_id, ticker, time.time()),
+            )
+            return self._job(conn, job_id)
+
+    def get(self, job_id):
+        return self._job(self._connection(), job_id)
+
+    def _pool(self):
+        # Created on first use, with spawned rather than forked workers, so
+        # the pool never inherits the web server's threads or locks
+        if self._executor is None:
+            # Under `python app.py` each spawned worker re-imports app.py as
+            # __mp_main__; it never predicts, so it skips the model warm-up.
+            # (This process read the flag when it imported the app.)
+            os.environ["BV_MODEL_WARMUP"] = "0"
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _reset_pool(self):
+        # Kills the workers too: a broken pool's survivors, or a hung fit
+        executor, self._executor = self._executor, None
+        self._pool_broken = False
+        if executor is None:
+            return
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _recover(self):
+        # Jobs claimed by a dispatcher that has since died (or by an earlier
+        # dispatcher thread of this process) are queued again
+        with self._running_lock:
+            tracked = set(self._running)
+        with self._transaction() as conn:
+            running = conn.execute(
+                "SELECT id, claimed_by FROM forecast_jobs WHERE status = 'running'"
+            ).fetchall()
+            for job_id, claimed_by in running:
+                orphaned = claimed_by == os.getpid() and job_id not in tracked
+                if claimed_by is None or orphaned or not _alive(claimed_by):
+                    self._requeue(conn, job_id)
+
+    @staticmethod
+    def _requeue(conn, job_id):
+        conn.execute(
+            "UPDATE forecast_jobs SET status = 'pending', claimed_by = NULL WHERE id = ?", (job_id,)
+        )
+
+    def _claim(self):
+        with self._transaction() as conn:
+            pending = conn.execute(
+                "SELECT id, ticker FROM forecast_jobs WHERE status = 'pending' ORDER BY submitted_at"
+            ).fetchall()
+            for job_id, _ in pending:
+                conn.execute(
+                    "UPDATE forecast_jobs SET status = 'running', claimed_by = ? WHERE id = ?",
+                    (os.getpid(), job_id),
+                )
+        return pending
+
+    def _prune(self):
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM forecast_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - JOB_TTL_SECONDS,),
+            )
+
+    def _record(self, job_id, status, result=None, error=None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE forecast_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def _finish(self, job_id, ticker, future):
+        with self._running_lock:
+            # Jobs given up on (timed out, or requeued and maybe running again
+            # on a new pool) are recorded elsewhere
+            entry = self._running.get(job_id)
+            if entry is None or entry[1] is not future:
+                return
+            del self._running[job_id]
+        try:
+            result, error, status = json.dumps(future.result()), None, "done"
+        except BrokenProcessPool:
+            # Every job in flight fails with this, not just the one that crashed
+            self._pool_broken = True
+            result, error, status = None, "Forecast worker process died", "failed"
+        except Exception as e:
+            result, error, status = None, str(e), "failed"
+        if error is not None:
+            print(f"Forecast job for {ticker} failed: {error}")
+        self._record(job_id, status, result, error)
+
+    def _dispatch(self, job_id, ticker):
+        future = None
+        try:
+            try:
+                future = self._pool().submit(run_forecast, ticker)
+            except BrokenProcessPool:
+                self._reset_pool()
+                future = self._pool().submit(run_forecast, ticker)
+        except Exception as e:
+            print(f"Could not start forecast job for {ticker}: {e}")
+            self._record(job_id, "failed", error=f"Could not start forecast: {e}")
+            return
+        with self._running_lock:
+            self._running[job_id] = [ticker, future, None]
+        future.add_done_callback(partial(self._finish, job_id, ticker))
+
+    def _expire(self, timeout):
+        # Timed from when the pool starts a job, not from when it was queued
+        now = time.monotonic()
+        with self._running_lock:
+            for entry in self._running.values():
+                if entry[2] is None and entry[1].running():
+                    entry[2] = now
+            # The pool marks one more job running than it has workers, so
+            # only the oldest `workers` of them can really be executing
+            started = sorted(
+                ((entry[2], job_id) for job_id, entry in self._running.items() if entry[2] is not None),
+                key=lambda item: item[0],
+            )[:self.workers]
+            hung = [job_id for since, job_id in started if now - since > timeout]
+            if not hung:
+                return
+            # A running fit can't be cancelled, only its process killed, which
+            # takes the pool and the other jobs in it down too
+            abandoned, self._running = self._running, {}
+        with self._transaction() as conn:
+            for job_id, (ticker, _, _) in abandoned.items():
+                if job_id in hung:
+                    print(f"Forecast job for {ticker} timed out after {timeout:.0f}s")
+                    conn.execute(
+                        "UPDATE forecast_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (f"Timed out after {timeout:.0f}s", time.time(), job_id),
+                    )
+                else:
+                    self._requeue(conn, job_id)
+        self._reset_pool()
+
+    def run(self, poll_seconds=POLL_SECONDS, timeout=JOB_TIMEOUT_SECONDS):
+        """Dispatch pending jobs to the pool until the process exits."""
+        self._recover()
+        next_prune = 0
+        while True:
+            try:
+                if self._pool_broken:
+                    self._reset_pool()
+                self._expire(timeout)
+                for job_id, ticker in self._claim():
+                    self._dispatch(job_id, ticker)
+                if time.monotonic() >= next_prune:
+                    self._prune()
+                    next_prune = time.monotonic() + 60
+            except Exception as e:
+                # Never let the dispatcher die: its claimed jobs would be stuck.
+                # Any it claimed but didn't get to dispatch are queued again.
+                print(f"Forecast dispatcher: {e}")
+                try:
+                    self._recover()
+                except Exception as e:
+                    print(f"Forecast dispatcher: {e}")
+            time.sleep(poll_seconds)
+
+    def start(self):
+        """Run the dispatcher on a thread of this process (again if it died)."""
+        with self._dispatcher_lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self.run, name="forecast-dispatcher", daemon=True)
+                self._dispatcher.start()
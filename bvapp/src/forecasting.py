@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+# Training window and horizon of the ARIMA price forecast
+ARIMA_START = "2015-01-01"
+ARIMA_END = "2024-01-01"
+N_PERIODS = 30
+
+# How long a selected (p,d,q) order is trusted before a full re-search, and
+# how much worse the per-observation AIC of a fixed-order fit may get before
+# the order is considered stale regardless of age
+ORDER_CACHE_PATH = os.environ.get("BV_ARIMA_ORDER_CACHE", "arima_orders.sqlite")
+ORDER_MAX_AGE_SECONDS = float(os.environ.get("BV_ARIMA_ORDER_MAX_AGE", 7 * 24 * 60 * 60))
+AIC_TOLERANCE = float(os.environ.get("BV_ARIMA_AIC_TOLERANCE", 0.02))
+
+
+def training_fingerprint(series):
+    """Identify a training window by its dates and values."""
+    digest = hashlib.sha1(np.ascontiguousarray(series.values, dtype=np.float64).tobytes())
+    return f"{series.index[0]:%Y-%m-%d}:{series.index[-1]:%Y-%m-%d}:{len(series)}:{digest.hexdigest()[:16]}"
+
+
+class ArimaOrderCache:
+    """Selected ARIMA orders per ticker, one SQLite row each.
+
+    Every put() is a single-row upsert, so processes sharing the file
+    (forecast workers, the nightly batch) never overwrite each other's
+    entries, and get() always sees the latest committed one.
+    """
+
+    def __init__(self, path=ORDER_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS arima_orders (ticker TEXT PRIMARY KEY, entry TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, ticker):
+        row = self._connection().execute(
+            "SELECT entry FROM arima_orders WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, ticker, entry):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO arima_orders (ticker, entry) VALUES (?, ?)",
+                (ticker, json.dumps(entry)),
+            )
+
+
+order_cache = ArimaOrderCache()
+
+
+def _aic_per_obs(model, n_obs):
+    return float(model.aic()) / n_obs
+
+
+def _search_order(ticker, series, fingerprint, cache):
+    from pmdarima import auto_arima
+
+    started = time.perf_counter()
+    model = auto_arima(series, seasonal=False, trace=True, stepwise=True)
+    search_seconds = time.perf_counter() - started
+    print(f"ARIMA order search for {ticker}: {model.order} in {search_seconds:.2f}s")
+    cache.put(ticker, {
+        "order": list(model.order),
+        "with_intercept": bool(model.with_intercept),
+        "fingerprint": fingerprint,
+        "aic_per_obs": _aic_per_obs(model, len(series)),
+        "searched_at": time.time(),
+        "search_seconds": search_seconds,
+        "fit_seconds": None,
+        "fits": 0,
+    })
+    return model
+
+
+def fit_arima(ticker, series, cache=None, max_age=ORDER_MAX_AGE_SECONDS):
+    """Fit ARIMA to series, reusing the ticker's cached order while it is fresh.
+
+    A full auto_arima search only runs when there is no cached order, it is
+    older than max_age, or a fixed-order fit on new data is noticeably worse
+    than the fit the order was selected on.
+    """
+    from pmdarima import ARIMA
+
+    cache = order_cache if cache is None else cache
+    fingerprint = training_fingerprint(series)
+    entry = cache.get(ticker)
+
+    if entry is None or time.time() - entry["searched_at"] > max_age:
+        return _search_order(ticker, series, fingerprint, cache)
+
+    started = time.perf_counter()
+    model = ARIMA(order=tuple(entry["order"]), with_intercept=entry["with_intercept"])
+    model.fit(series)
+    fit_seconds = time.perf_counter() - started
+
+    if fingerprint != entry["fingerprint"]:
+        aic_per_obs = _aic_per_obs(model, len(series))
+        if aic_per_obs > entry["aic_per_obs"] + AIC_TOLERANCE:
+            print(f"Cached ARIMA order for {ticker} no longer fits "
+                  f"(AIC/obs {aic_per_obs:.4f} vs {entry['aic_per_obs']:.4f}), re-searching")
+            return _search_order(ticker, series, fingerprint, cache)
+
+    print(f"ARIMA{tuple(entry['order'])} for {ticker}: fixed-order fit {fit_seconds:.2f}s "
+          f"vs {entry['search_seconds']:.2f}s order search")
+    cache.put(ticker, {**entry, "fit_seconds": fit_seconds, "fits": entry["fits"] + 1})
+    return model
+
+
+def arima_forecast(ticker, close, n_periods=N_PERIODS, cache=None):
+    """Forecast the next n_periods closes from a daily close series.
+
+    The model is fitted on first differences; returns the forecast and its
+    (n_periods, 2) confidence interval on the price scale.
+    """
+    stock_diff = close.diff().dropna()
+    model = fit_arima(ticker, stock_diff, cache=cache)
+    forecast, conf_int = model.predict(n_periods=n_periods, return_conf_int=True)
+
+    last_close = close.iloc[-1]
+    forecast = np.asarray(forecast).cumsum() + last_close
+    conf_int = np.asarray(conf_int).cumsum(axis=0) + last_close
+    return forecast, conf_int
+
+
+# Forecasts precomputed for every constituent by batch_forecast.py
+BATCH_FORECAST_PATH = os.environ.get("BV_BATCH_FORECASTS", "forecasts.npz")
+BATCH_MAX_AGE_SECONDS = float(os.environ.get("BV_BATCH_FORECAST_MAX_AGE", 26 * 60 * 60))
+
+
+class BatchForecasts:
+    """Read side of the nightly forecast artifact; reloaded when the file changes."""
+
+    def __init__(self, path=BATCH_FORECAST_PATH, max_age=BATCH_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = None
+        self._rows = {}
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._data, self._rows, self._mtime = None, {}, None
+            return
+        if mtime != self._mtime:
+            with np.load(self.path) as artifact:
+                self._data = {key: artifact[key] for key in artifact.files}
+            self._rows = {ticker: i for i, ticker in enumerate(self._data["tickers"])}
+            self._mtime = mtime
+
+    def get(self, ticker, last_date):
+        """(forecast, conf_int) for ticker if the artifact is fresh and was
+        computed on a window ending at last_date, otherwise None."""
+        with self._lock:
+            self._reload()
+            data = self._data
+            if data is None or time.time() - float(data["generated_at"]) > self.max_age:
+                return None
+            row = self._rows.get(ticker)
+            if row is None or data["last_dates"][row] != f"{last_date:%Y-%m-%d}":
+                return None
+            conf_int = np.column_stack([data["lower"][row], data["upper"][row]])
+            return data["forecast"][row].astype(np.float64), conf_int.astype(np.float64)
+
+
+batch_forecasts = BatchForecasts()
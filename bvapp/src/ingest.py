@@ -0,0 +1,140 @@
+"""Bulk ingestion of LSTM training data.
+
+Tickers are brought up to date in the price store in multi-ticker batches
+on a bounded thread pool (one yf.download per batch, and only for missing
+or stale histories), then their closes are read back from the store, which
+the web app shares. Failed tickers are retried with exponential backoff,
+and every ticker that arrives is scaled and written to its shard by a pool
+of worker processes while the remaining batches continue. A manifest
+records the rows written (or the last error) per ticker so a rerun only
+fetches what is missing:
+
+    python ingest.py --batch-size 50 --fetch-workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from price_store import get_store
+from training_data import SHARD_DIR, load_manifest, manifest_path, write_shard
+
+
+TRAIN_START = "2010-01-01"
+TRAIN_END = "2024-10-01"
+
+BATCH_SIZE = int(os.environ.get("BV_INGEST_BATCH_SIZE", 50))
+FETCH_WORKERS = int(os.environ.get("BV_INGEST_FETCH_WORKERS", 4))
+PROCESS_WORKERS = int(os.environ.get("BV_INGEST_PROCESS_WORKERS", os.cpu_count() or 1))
+MAX_RETRIES = int(os.environ.get("BV_INGEST_RETRIES", 3))
+BACKOFF_SECONDS = float(os.environ.get("BV_INGEST_BACKOFF", 2))
+
+
+def save_manifest(manifest, shard_dir):
+    os.makedirs(shard_dir, exist_ok=True)
+    path = manifest_path(shard_dir)
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def fetch_batch(tickers, start, end):
+    """Returns ({ticker: closes}, {ticker: reason}) for one batch, read
+    through the price store after one bulk update."""
+    store = get_store()
+    errors = store.update_many(tickers)
+    closes = {}
+    failures = {ticker: f"{type(e).__name__}: {e}" for ticker, e in errors.items()}
+    for ticker in tickers:
+        if ticker in failures:
+            continue
+        close = store.read(ticker, start, end)["Close"].dropna()
+        if close.empty:
+            failures[ticker] = f"No price history between {start} and {end}"
+        else:
+            closes[ticker] = close.values
+    return closes, failures
+
+
+def is_complete(entry, start, end):
+    return (
+        entry is not None
+        and entry.get("status") == "complete"
+        and entry.get("start") == start
+        and entry.get("end") == end
+    )
+
+
+def ingest(tickers, start=TRAIN_START, end=TRAIN_END, shard_dir=SHARD_DIR,
+           batch_size=BATCH_SIZE, fetch_workers=FETCH_WORKERS,
+           process_workers=PROCESS_WORKERS, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Fetch and shard every ticker not already complete in the manifest."""
+    started = time.perf_counter()
+    manifest = load_manifest(shard_dir)
+    pending = [t for t in tickers if not is_complete(manifest.get(t), start, end)]
+    print(f"Ingesting {len(pending)} tickers ({len(tickers) - len(pending)} already complete)")
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetchers, ProcessPoolExecutor(
+        max_workers=process_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as processors:
+        shard_jobs = {}
+        to_fetch = pending
+        for attempt in range(retries + 1):
+            if not to_fetch:
+                break
+            if attempt:
+                delay = backoff * 2 ** (attempt - 1)
+                print(f"Retrying {len(to_fetch)} tickers in {delay:.0f}s (attempt {attempt + 1})")
+                time.sleep(delay)
+
+            batches = [to_fetch[i:i + batch_size] for i in range(0, len(to_fetch), batch_size)]
+            fetches = [fetchers.submit(fetch_batch, batch, start, end) for batch in batches]
+            failures = {}
+            for fetch in as_completed(fetches):
+                closes, batch_failures = fetch.result()
+                failures.update(batch_failures)
+                # Scale and shard each ticker as soon as its batch lands
+                for ticker, prices in closes.items():
+                    job = processors.submit(write_shard, ticker, prices, shard_dir)
+                    shard_jobs[job] = ticker
+            to_fetch = list(failures)
+
+        for job in as_completed(shard_jobs):
+            ticker = shard_jobs[job]
+            try:
+                manifest[ticker] = {"status": "complete", "rows": job.result(), "start": start, "end": end}
+            except Exception as e:
+                failures[ticker] = f"{type(e).__name__}: {e}"
+            save_manifest(manifest, shard_dir)
+
+    for ticker, reason in failures.items():
+        manifest[ticker] = {"status": "failed", "error": reason, "attempts": retries + 1,
+                            "start": start, "end": end}
+    save_manifest(manifest, shard_dir)
+
+    complete = sum(is_complete(manifest.get(t), start, end) for t in tickers)
+    print(f"Ingested {len(pending) - len(failures)} tickers in {time.perf_counter() - started:.1f}s; "
+          f"{complete}/{len(tickers)} complete, {len(failures)} failed")
+    for ticker, reason in sorted(failures.items()):
+        print(f"Failed {ticker}: {reason}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shard-dir", default=SHARD_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS)
+    parser.add_argument("--process-workers", type=int, default=PROCESS_WORKERS)
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES)
+    args = parser.parse_args()
+
+    with open("./sp500_tickers.json", "r") as file:
+        tickers = list(json.load(file))
+
+    ingest(tickers, shard_dir=args.shard_dir, batch_size=args.batch_size,
+           fetch_workers=args.fetch_workers, process_workers=args.process_workers,
+           retries=args.retries)
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+LOGO_URL = "https://logo.clearbit.com/{domain}"
+LOGO_CACHE_PATH = os.environ.get("BV_LOGO_CACHE", "logo_cache.json")
+LOGO_TTL_SECONDS = float(os.environ.get("BV_LOGO_TTL_SECONDS", 30 * 24 * 60 * 60))
+# Domains without a logo are checked again sooner, in case one appears
+LOGO_NEGATIVE_TTL_SECONDS = float(os.environ.get("BV_LOGO_NEGATIVE_TTL_SECONDS", 24 * 60 * 60))
+LOGO_TIMEOUT = float(os.environ.get("BV_LOGO_TIMEOUT", 5))
+
+
+def check_logo(domain):
+    """The logo URL for a domain, or None if there is no logo.
+
+    Uses a HEAD request, falling back to a GET that doesn't read the body
+    where HEAD isn't allowed. Network errors are raised, not treated as
+    "no logo".
+    """
+    url = LOGO_URL.format(domain=domain)
+    response = requests.head(url, timeout=LOGO_TIMEOUT, allow_redirects=True)
+    if response.status_code == 405:
+        with requests.get(url, timeout=LOGO_TIMEOUT, stream=True) as response:
+            pass
+    return url if response.status_code < 400 else None
+
+
+class LogoCache:
+    """Company domain -> logo URL (or None), persisted to disk.
+
+    lookup() never waits on the network: it answers from the cache and
+    resolves unknown or expired domains on a background thread, so the
+    logo shows up on a later request.
+    """
+
+    def __init__(self, path=LOGO_CACHE_PATH, ttl=LOGO_TTL_SECONDS,
+                 negative_ttl=LOGO_NEGATIVE_TTL_SECONDS, check=check_logo):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.check = check
+        self._entries = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="logos")
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                self._entries = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable logo cache: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        # One writer at a time, so an older snapshot never replaces a newer one
+        with self._save_lock:
+            with self._lock:
+                entries = dict(self._entries)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(entries, file)
+            os.replace(tmp_path, self.path)
+
+    def _expired(self, entry):
+        ttl = self.ttl if entry["url"] else self.negative_ttl
+        return time.time() - entry["checked_at"] >= ttl
+
+    def _resolve(self, domain):
+        try:
+            url = self.check(domain)
+        except Exception as e:
+            # Not cached, so the next lookup tries again
+            print(f"Could not retrieve logo for {domain}: {e}")
+            with self._lock:
+                self._pending.discard(domain)
+            return
+        with self._lock:
+            self._entries[domain] = {"url": url, "checked_at": time.time()}
+            self._pending.discard(domain)
+        self._save()
+
+    def lookup(self, domain):
+        if not domain or domain == "N/A":
+            return None
+        with self._lock:
+            entry = self._entries.get(domain)
+            stale = entry is None or self._expired(entry)
+            schedule = stale and domain not in self._pending
+            if schedule:
+                self._pending.add(domain)
+        if schedule:
+            self._executor.submit(self._resolve, domain)
+        # An expired logo is still shown until the recheck replaces it
+        return entry["url"] if entry else None
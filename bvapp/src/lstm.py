@@ -2,15 +2,19 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=UserWarning)
 
-import yfinance as yf
 import pickle
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from keras.models import Sequential
 from keras.layers import LSTM, Dense, Dropout
 import matplotlib.pyplot as plt
 
+from price_store import get_store
+from ingest import ingest
+from training_data import SHARD_DIR, ShardedSequences
+
 # Fetch S&P 500 tickers from Wikipedia
 def get_sp500_tickers():
     url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
@@ -20,13 +24,20 @@ def get_sp500_tickers():
     return tickers
 
 # Create sequences for LSTM
-def create_sequences(data, seq_length):
-    sequences = []
-    labels = []
-    for i in range(len(data) - seq_length):
-        sequences.append(data[i:i + seq_length])
-        labels.append(data[i + seq_length])
-    return np.array(sequences), np.array(labels)
+# Windows are a strided view over data, so no price is copied per window.
+# Pass dtype (e.g. np.float32) to convert the series once before windowing.
+def create_sequences(data, seq_length, dtype=None):
+    data = np.asarray(data, dtype=dtype)
+    n_windows = len(data) - seq_length
+    if n_windows <= 0:
+        empty = np.empty((0, seq_length) + data.shape[1:], dtype=data.dtype)
+        return empty, data[:0]
+
+    # sliding_window_view puts the window axis last: (n, features, seq_length)
+    windows = sliding_window_view(data, seq_length, axis=0)[:n_windows]
+    sequences = np.moveaxis(windows, -1, 1)
+    labels = data[seq_length:]
+    return sequences, labels
 
 # Prepare data for all tickers and combine
 def prepare_combined_data(tickers, seq_length):
@@ -36,7 +47,7 @@ def prepare_combined_data(tickers, seq_length):
     for ticker in tickers:
         try:
             print(f"Processing {ticker}...")
-            stock_data = yf.download(ticker, start="2010-01-01", end="2024-10-01")
+            stock_data = get_store().get_history(ticker, start="2010-01-01", end="2024-10-01")
 
             if stock_data.empty:
                 print(f"No data found for {ticker}")
@@ -73,18 +84,30 @@ def prepare_combined_data(tickers, seq_length):
     return all_sequences, all_labels
 
 # Train a single LSTM model for all S&P 500 stocks
-def train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32):
+# With streaming=True the training set is never materialised: windows are read
+# from per-ticker shards in shuffled, prefetched batches, so peak memory does
+# not grow with the number of tickers or seq_length.
+def train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32, streaming=False, shard_dir=SHARD_DIR):
     tickers = get_sp500_tickers()
 
-    # Prepare data for all tickers
-    X_train, y_train = prepare_combined_data(tickers, seq_length)
-
-    if X_train is None or y_train is None:
-        print("No training data available. Exiting.")
-        return None
-
-    # Reshape inputs for LSTM [samples, time steps, features]
-    X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
+    if streaming:
+        # Bulk download and shard the closes; tickers already in the
+        # manifest from an earlier run are skipped
+        manifest = ingest(tickers, shard_dir=shard_dir)
+        if not any(entry["status"] == "complete" for entry in manifest.values()):
+            print("No training data available. Exiting.")
+            return None
+        dataset = ShardedSequences(shard_dir, tickers, seq_length=seq_length, batch_size=batch_size)
+    else:
+        # Prepare data for all tickers
+        X_train, y_train = prepare_combined_data(tickers, seq_length)
+
+        if X_train is None or y_train is None:
+            print("No training data available. Exiting.")
+            return None
+
+        # Reshape inputs for LSTM [samples, time steps, features]
+        X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
 
     # Build the LSTM model
     model = Sequential()
@@ -99,7 +122,10 @@ def train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32):
     model.compile(optimizer='adam', loss='mean_squared_error')
 
     # Train the model
-    model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, verbose=1)
+    if streaming:
+        model.fit(dataset.batches(), steps_per_epoch=len(dataset), epochs=epochs, verbose=1)
+    else:
+        model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, verbose=1)
 
     # Save the model
     with open('combined_sp500_lstm_model.pkl', 'wb') as file:
@@ -113,8 +139,8 @@ def train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32):
 
 # Predict using the combined model
 def predict_stock_price_combined_model(ticker, model, seq_length=60):
-    # Download stock data
-    stock_data = yf.download(ticker, start="2010-01-01", end="2024-10-01")
+    # Read stock data from the local store (only the missing tail is downloaded)
+    stock_data = get_store().get_history(ticker, start="2010-01-01", end="2024-10-01")
 
     if stock_data.empty:
         print(f"No data found for {ticker}")
@@ -141,7 +167,7 @@ def predict_stock_price_combined_model(ticker, model, seq_length=60):
 # Main execution
 if __name__ == '__main__':
     # Train the combined model
-    combined_model = train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32)
+    combined_model = train_combined_lstm_model(seq_length=60, epochs=10, batch_size=32, streaming=True)
 
     # Example to predict stock price for a specific ticker using the combined model
     if combined_model:
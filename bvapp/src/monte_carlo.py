@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dcf import FORECAST_YEARS, TERMINAL_GROWTH_RATE, cost_of_equity, dcf_values, wacc
+
+
+SIMULATION_CHUNK = int(os.environ.get("BV_SIMULATION_CHUNK", 65_536))
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Spread assumed when the history is too short to measure one
+FALLBACK_GROWTH_SD = 0.05
+FALLBACK_BETA_SD = 0.25
+FALLBACK_DEBT_SD = 0.2  # relative to the point estimate
+
+# Terminal growth is a long-run assumption rather than something the
+# company's own history can tell us, so it is drawn from a fixed range
+TERMINAL_GROWTH_RANGE = (0.015, TERMINAL_GROWTH_RATE, 0.035)
+
+
+def estimate_beta(stock_close, market_close):
+    """Beta and its standard error from weekly returns against the market."""
+    import pandas as pd
+
+    prices = pd.concat([stock_close, market_close], axis=1, join="inner").dropna()
+    returns = prices.resample("W").last().pct_change().dropna().values
+    if len(returns) < 20:
+        return None
+    stock, market = returns[:, 0], returns[:, 1]
+    market_var = market.var(ddof=1)
+    beta = np.cov(stock, market, ddof=1)[0, 1] / market_var
+    residuals = stock - stock.mean() - beta * (market - market.mean())
+    se = np.sqrt(residuals.var(ddof=2) / (market_var * (len(returns) - 1)))
+    return float(beta), float(se)
+
+
+def _normal(values, fallback_mean, fallback_sd):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) >= 2:
+        return float(values.mean()), float(values.std(ddof=1))
+    return float(fallback_mean), float(fallback_sd)
+
+
+def fit_distributions(inputs, beta_estimate=None):
+    """Sampling distributions for EBITDA growth, beta and cost of debt,
+    fitted to the company's history, plus the terminal growth range."""
+    growth = _normal(inputs["growth_rates"], inputs["avg_growth_rate"], FALLBACK_GROWTH_SD)
+
+    if beta_estimate is not None:
+        beta = beta_estimate
+    else:
+        beta = (inputs["beta"], FALLBACK_BETA_SD)
+
+    point_kd = abs(inputs["interest_expense"]) / inputs["total_debt"] if inputs["total_debt"] > 0 else 0
+    cost_of_debt = _normal(inputs["cost_of_debt_history"], point_kd, point_kd * FALLBACK_DEBT_SD)
+
+    return {
+        "growth": growth,
+        "beta": beta,
+        "cost_of_debt": cost_of_debt,
+        "terminal_growth": TERMINAL_GROWTH_RANGE,
+    }
+
+
+def simulate_chunk(inputs, distributions, seed, chunk_index, size, years=FORECAST_YEARS):
+    """Equity value per share for one chunk of paths.
+
+    Each chunk draws from its own child of the seed, so results do not depend
+    on the chunk size being split over one process or many.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+    growth = rng.normal(*distributions["growth"], size).clip(-0.5, 1.0)
+    beta = rng.normal(*distributions["beta"], size)
+    cost_of_debt = rng.normal(*distributions["cost_of_debt"], size).clip(0, None)
+    terminal_growth = rng.triangular(*distributions["terminal_growth"], size)
+
+    discount_rate = wacc(
+        inputs["market_cap"], inputs["total_debt"], cost_of_equity(beta), cost_of_debt, inputs["tax_rate"]
+    )
+    # Same adjustment as the point estimate: keep WACC above terminal growth
+    discount_rate = np.where(discount_rate <= terminal_growth, terminal_growth + 0.01, discount_rate)
+
+    return dcf_values(inputs, growth, discount_rate, terminal_growth, years)["equity_value_per_share"]
+
+
+def simulate(inputs, distributions, paths=100_000, seed=0, chunk_size=SIMULATION_CHUNK, workers=1):
+    """Equity value per share for `paths` simulated paths, computed in chunks
+    of chunk_size so the working set stays bounded. workers > 1 spreads the
+    chunks over processes; the output is identical for any worker count.
+    """
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    values = np.empty(paths, dtype=np.float64)
+
+    if workers <= 1:
+        chunks = (simulate_chunk(inputs, distributions, seed, i, n) for i, n in enumerate(sizes))
+        start = 0
+        for chunk in chunks:
+            values[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        return values
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(simulate_chunk, inputs, distributions, seed, i, n) for i, n in enumerate(sizes)]
+        start = 0
+        for future in futures:
+            chunk = future.result()
+            values[start:start + len(chunk)] = chunk
+            start += len(chunk)
+    return values
+
+
+def summarize(values, percentiles=PERCENTILES):
+    valid = values[np.isfinite(values)]
+    if not len(valid):
+        return {"paths": len(values), "valid_paths": 0}
+    return {
+        "paths": len(values),
+        "valid_paths": len(valid),
+        "mean": float(valid.mean()),
+        "percentiles": {
+            f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(valid, percentiles))
+        },
+    }
@@ -0,0 +1,161 @@
+"""News headlines and 30-day sentiment from stocknewsapi, cached per ticker.
+
+Point BV_NEWS_API_BASE at a local stub (serving /stat and / with the same
+JSON) to run without the real API.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+NEWS_API_BASE = os.environ.get("BV_NEWS_API_BASE", "https://stocknewsapi.com/api/v1").rstrip("/")
+NEWS_API_KEY = os.environ.get("BV_NEWS_API_KEY", "wepcdviwg2zsakkku9cup9x3aua7gxia2790oc2k")
+NEWS_TIMEOUT = float(os.environ.get("BV_NEWS_TIMEOUT", 5))
+NEWS_TTL_SECONDS = float(os.environ.get("BV_NEWS_TTL_SECONDS", 30 * 60))
+NEWS_CACHE_ENTRIES = int(os.environ.get("BV_NEWS_CACHE_ENTRIES", 1024))
+
+# After this many failures in a row the API is left alone for the cooldown
+BREAKER_FAILURES = int(os.environ.get("BV_NEWS_BREAKER_FAILURES", 3))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("BV_NEWS_BREAKER_COOLDOWN_SECONDS", 60))
+
+TOP_NEWS = 3
+
+# The stat and articles calls of every fetch run here; background refreshes
+# get their own pool, since they wait on this one
+news_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news")
+refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="news-refresh")
+
+
+class NewsUnavailable(Exception):
+    """No news could be fetched and none is cached."""
+
+
+def _get_json(path, params):
+    response = requests.get(
+        f"{NEWS_API_BASE}{path}", params={**params, "token": NEWS_API_KEY}, timeout=NEWS_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def sentiment_category(score):
+    if score < -0.5:
+        return "Bearish"
+    if score > 0.5:
+        return "Bullish"
+    return "Neutral"
+
+
+def fetch_news(ticker):
+    """The /api/news payload for a ticker, with both API calls in flight at once."""
+    stat = news_executor.submit(
+        _get_json, "/stat", {"tickers": ticker, "date": "last30days", "page": 1}
+    )
+    articles = news_executor.submit(
+        _get_json, "", {"tickers": ticker, "items": TOP_NEWS, "page": 1}
+    )
+    sentiment_data = stat.result()
+    news_data = articles.result()
+
+    sentiment_score = sentiment_data["total"][ticker]["Sentiment Score"]
+    top_news = {
+        i + 1: {field: article[field] for field in ("title", "news_url", "text")}
+        for i, article in enumerate(news_data["data"][:TOP_NEWS])
+    }
+    return {
+        "top_news": top_news,
+        "average_sentiment_score": sentiment_score,
+        "avg_sentiment_category": sentiment_category(sentiment_score),
+    }
+
+
+class NewsCache:
+    """Per-ticker news with a TTL, stale-while-revalidate and a circuit breaker.
+
+    A fresh entry is returned as is. A stale one is returned straight away
+    while one background refresh replaces it. Only a ticker with nothing
+    cached waits on the API. After BREAKER_FAILURES failures in a row the
+    API isn't called for BREAKER_COOLDOWN_SECONDS: cached (even stale) news
+    is served and uncached tickers fail fast.
+    """
+
+    def __init__(self, fetch=fetch_news, ttl=NEWS_TTL_SECONDS, max_entries=NEWS_CACHE_ENTRIES,
+                 breaker_failures=BREAKER_FAILURES, breaker_cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0
+
+    def breaker_open(self):
+        return time.monotonic() < self._open_until
+
+    def _record(self, ok):
+        with self._lock:
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.breaker_failures:
+                self._open_until = time.monotonic() + self.breaker_cooldown
+                print(f"News API failed {self._failures} times in a row; "
+                      f"pausing calls for {self.breaker_cooldown:.0f}s")
+
+    def _store(self, ticker, payload):
+        with self._lock:
+            self._entries[ticker] = (payload, time.monotonic())
+            self._entries.move_to_end(ticker)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, ticker):
+        try:
+            payload = self.fetch(ticker)
+        except Exception:
+            self._record(ok=False)
+            raise
+        self._record(ok=True)
+        self._store(ticker, payload)
+        return payload
+
+    def _refresh(self, ticker):
+        try:
+            self._load(ticker)
+        except Exception as e:
+            print(f"Background news refresh for {ticker} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(ticker)
+
+    def get(self, ticker):
+        with self._lock:
+            cached = self._entries.get(ticker)
+            if cached is not None:
+                self._entries.move_to_end(ticker)
+
+        if cached is not None:
+            payload, fetched_at = cached
+            if time.monotonic() - fetched_at >= self.ttl and not self.breaker_open():
+                with self._lock:
+                    start = ticker not in self._refreshing
+                    self._refreshing.add(ticker)
+                if start:
+                    refresh_executor.submit(self._refresh, ticker)
+            return payload
+
+        if self.breaker_open():
+            raise NewsUnavailable("News service is temporarily unavailable.")
+        try:
+            return self._load(ticker)
+        except Exception as e:
+            print(f"Error fetching news for {ticker}: {e}")
+            raise NewsUnavailable("Could not fetch news for this ticker.")
@@ -0,0 +1,172 @@
+"""NumPy inference for the combined LSTM, so serving doesn't need TensorFlow.
+
+The exporter reads the layer config and weights of the Keras H5 file with
+h5py alone and writes them to a compact .npz; NumpyLSTM runs the forward
+pass (LSTM -> Dropout -> LSTM -> Dropout -> Dense -> Dense) over a batch:
+
+    python numpy_lstm.py export combined_sp500_lstm_model.h5 combined_sp500_lstm_model.npz
+    python numpy_lstm.py verify combined_sp500_lstm_model.h5 combined_sp500_lstm_model.npz
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _hard_sigmoid(x):
+    # Keras 3 definition: relu6(x + 3) / 6
+    return np.clip((x + 3) / 6, 0, 1)
+
+
+activations = {
+    "linear": lambda x: x,
+    None: lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "relu": lambda x: np.maximum(x, 0),
+}
+
+# Layers that do nothing at inference time
+passthrough_layers = {"InputLayer", "Dropout"}
+
+
+def export_weights(h5_path, npz_path):
+    """Write the layer stack and float32 weights of a Keras H5 model to .npz."""
+    import h5py
+
+    layers = []
+    arrays = {}
+    with h5py.File(h5_path, "r") as file:
+        config = json.loads(file.attrs["model_config"])
+        weights = file["model_weights"]
+        for layer in config["config"]["layers"]:
+            kind = layer["class_name"]
+            layer_config = layer["config"]
+            if kind in passthrough_layers:
+                continue
+            if kind not in ("LSTM", "Dense"):
+                raise ValueError(f"Unsupported layer {kind} ({layer_config['name']})")
+            if kind == "LSTM" and (layer_config.get("go_backwards") or layer_config.get("stateful")):
+                raise ValueError(f"Unsupported LSTM options on {layer_config['name']}")
+
+            index = len(layers)
+            group = weights[layer_config["name"]]
+            for weight_name in group.attrs["weight_names"]:
+                weight_name = weight_name.decode() if isinstance(weight_name, bytes) else weight_name
+                key = weight_name.rsplit("/", 1)[-1]
+                arrays[f"layer{index}_{key}"] = np.asarray(group[weight_name], dtype=np.float32)
+            layers.append({
+                "kind": kind,
+                "name": layer_config["name"],
+                "activation": layer_config.get("activation"),
+                "recurrent_activation": layer_config.get("recurrent_activation"),
+                "return_sequences": layer_config.get("return_sequences", False),
+                "use_bias": layer_config.get("use_bias", True),
+            })
+
+    tmp_path = f"{npz_path}.tmp.npz"
+    np.savez(tmp_path, layers=np.array(json.dumps(layers)), **arrays)
+    os.replace(tmp_path, npz_path)
+    return layers
+
+
+class NumpyLSTM:
+    """Drop-in replacement for the Keras model's predict()."""
+
+    def __init__(self, npz_path):
+        with np.load(npz_path) as artifact:
+            self.layers = json.loads(str(artifact["layers"]))
+            self.weights = {key: artifact[key] for key in artifact.files if key != "layers"}
+
+    def _weight(self, index, name):
+        return self.weights.get(f"layer{index}_{name}")
+
+    def _lstm(self, index, layer, x):
+        kernel = self._weight(index, "kernel")
+        recurrent = self._weight(index, "recurrent_kernel")
+        bias = self._weight(index, "bias")
+        activation = activations[layer["activation"]]
+        recurrent_activation = activations[layer["recurrent_activation"]]
+
+        batch, steps, _ = x.shape
+        units = recurrent.shape[0]
+        # Input projection for every time step at once; only the recurrent
+        # part has to run step by step
+        projected = x @ kernel
+        if bias is not None:
+            projected += bias
+
+        h = np.zeros((batch, units), dtype=x.dtype)
+        c = np.zeros((batch, units), dtype=x.dtype)
+        outputs = np.empty((batch, steps, units), dtype=x.dtype) if layer["return_sequences"] else None
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent
+            # Keras gate order: input, forget, cell candidate, output
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def _dense(self, index, layer, x):
+        y = x @ self._weight(index, "kernel")
+        bias = self._weight(index, "bias")
+        if bias is not None:
+            y += bias
+        return activations[layer["activation"]](y)
+
+    def predict(self, X, verbose=0, batch_size=None):
+        # verbose and batch_size are accepted for Keras compatibility
+        x = np.asarray(X, dtype=np.float32)
+        for index, layer in enumerate(self.layers):
+            if layer["kind"] == "LSTM":
+                x = self._lstm(index, layer, x)
+            else:
+                x = self._dense(index, layer, x)
+        return x
+
+
+def load_numpy_model(h5_path, npz_path):
+    """Load the NumPy runtime, (re-)exporting the weights if the .npz is
+    missing or older than the H5 model."""
+    if not os.path.exists(npz_path) or os.path.getmtime(npz_path) < os.path.getmtime(h5_path):
+        print(f"Exporting {h5_path} to {npz_path}...")
+        export_weights(h5_path, npz_path)
+    return NumpyLSTM(npz_path)
+
+
+def verify(h5_path, npz_path, samples=256, seq_length=60, tolerance=1e-4):
+    """Compare NumpyLSTM with Keras on random windows; needs Keras installed."""
+    from keras.models import load_model
+
+    X = np.random.default_rng(0).random((samples, seq_length, 1)).astype(np.float32)
+    expected = load_model(h5_path).predict(X, verbose=0)
+    actual = NumpyLSTM(npz_path).predict(X)
+    max_error = float(np.abs(expected - actual).max())
+    print(f"Max abs difference over {samples} windows: {max_error:.2e}")
+    return max_error <= tolerance
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("h5_path", nargs="?", default="combined_sp500_lstm_model.h5")
+    parser.add_argument("npz_path", nargs="?", default="combined_sp500_lstm_model.npz")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        layers = export_weights(args.h5_path, args.npz_path)
+        print(f"Exported {len(layers)} layers to {args.npz_path} "
+              f"({os.path.getsize(args.npz_path) / 1024:.0f} KiB)")
+    elif not verify(args.h5_path, args.npz_path):
+        raise SystemExit("NumPy runtime does not match Keras within tolerance")
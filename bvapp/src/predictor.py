@@ -0,0 +1,130 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# Largest stacked batch per forward pass, and how long the first request of a
+# batch may wait for others to join it
+PREDICT_MAX_BATCH = int(os.environ.get("BV_PREDICT_MAX_BATCH", 64))
+PREDICT_MAX_WAIT_MS = float(os.environ.get("BV_PREDICT_MAX_WAIT_MS", 5))
+
+
+def prediction_window(close, seq_length=60):
+    """Scale a close series and cut the model input from it.
+
+    Returns the (seq_length, 1) window and the (low, span) needed to map the
+    model's scaled output back to a price, matching the MinMaxScaler used in
+    training.
+    """
+    prices = np.asarray(close, dtype=np.float64)
+    if len(prices) < seq_length + 1:
+        raise ValueError(f"Need at least {seq_length + 1} closes, got {len(prices)}")
+    low = prices.min()
+    span = prices.max() - low or 1.0
+    scaled = (prices - low) / span
+    window = scaled[-(seq_length + 1):-1].reshape(seq_length, 1)
+    return window, low, span
+
+
+class MicroBatcher:
+    """Merges concurrent prediction requests into shared forward passes.
+
+    submit() queues an (n, seq_length, 1) array and returns a Future for its
+    (n, 1) predictions. A single worker thread takes the oldest request, waits
+    up to max_wait_ms for more to arrive (or until max_batch_size rows are
+    queued), then runs one predict_fn call over the stacked windows.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=PREDICT_MAX_BATCH, max_wait_ms=PREDICT_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._batch_sizes = {}
+        self._waits = deque(maxlen=1000)
+
+    def _ensure_started(self):
+        # Started lazily, and again after a fork, since threads don't survive it
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, windows):
+        windows = np.asarray(windows, dtype=np.float32)
+        future = Future()
+        self._ensure_started()
+        self._queue.put((windows, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+            try:
+                predictions = np.asarray(self.predict_fn(np.concatenate([w for w, _, _ in batch])))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for windows, future, _ in batch:
+                future.set_result(predictions[start:start + len(windows)])
+                start += len(windows)
+            self._record(batch, start, dispatched)
+
+    def _record(self, batch, rows, dispatched):
+        with self._metrics_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._rows += rows
+            self._batch_sizes[rows] = self._batch_sizes.get(rows, 0) + 1
+            self._waits.extend(dispatched - queued for _, _, queued in batch)
+
+    def metrics(self):
+        with self._metrics_lock:
+            waits_ms = np.array(self._waits) * 1000
+            return {
+                "batches": self._batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "mean_batch_size": self._rows / self._batches if self._batches else 0,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "queue_wait_ms": {
+                    "mean": float(waits_ms.mean()) if len(waits_ms) else 0,
+                    "p95": float(np.percentile(waits_ms, 95)) if len(waits_ms) else 0,
+                    "max": float(waits_ms.max()) if len(waits_ms) else 0,
+                },
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
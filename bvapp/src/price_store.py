@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import yfinance as yf
+
+
+# Location of the on-disk store and how often a ticker's tail is re-fetched
+DB_PATH = os.environ.get("BV_PRICE_STORE", "price_history.sqlite")
+REFRESH_SECONDS = float(os.environ.get("BV_PRICE_REFRESH_SECONDS", 15 * 60))
+
+# Relative difference on the overlapping bar that means Yahoo has re-adjusted
+# the series (split or dividend) and the stored history has to be replaced
+ADJUSTMENT_TOLERANCE = 1e-4
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetches (
+    ticker TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def _normalise(df):
+    # yf.download returns (Price, Ticker) columns even for a single ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    if df.index.tz is not None:
+        df = df.tz_localize(None)
+    return df.dropna(subset=["Close"])
+
+
+def download(ticker, raise_errors=True, **kwargs):
+    # Ticker.history rather than yf.download, so that a failed full download
+    # raises its real error instead of coming back as an empty frame
+    return yf.Ticker(ticker).history(
+        auto_adjust=True, actions=False, raise_errors=raise_errors, **kwargs
+    )
+
+
+def download_many(tickers, **kwargs):
+    """{ticker: bars} from one multi-ticker yf.download; tickers that failed
+    or came back empty are left out (yf.download doesn't raise for them)."""
+    try:
+        df = yf.download(
+            tickers, group_by="ticker", auto_adjust=True, progress=False, threads=False, **kwargs
+        )
+    except Exception as e:
+        print(f"Batch download of {len(tickers)} tickers failed: {e}")
+        return {}
+    frames = {}
+    for ticker in tickers:
+        if isinstance(df.columns, pd.MultiIndex):
+            if ticker not in df.columns.get_level_values(0):
+                continue
+            bars = _normalise(df[ticker])
+        else:
+            bars = _normalise(df)
+        if not bars.empty:
+            frames[ticker] = bars
+    return frames
+
+
+class PriceStore:
+    """Daily OHLCV bars per ticker, kept in SQLite and updated incrementally.
+
+    The first read of a ticker downloads its full history. Later reads only
+    fetch bars from the last stored date onwards (at most once every
+    ``refresh_seconds``) and serve the requested date range from disk.
+    """
+
+    def __init__(self, path=DB_PATH, refresh_seconds=REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._local = threading.local()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _ticker_lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def last_date(self, ticker):
+        row = self._connection().execute(
+            "SELECT MAX(date) FROM prices WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        return row[0]
+
+    def last_fetched(self, ticker):
+        row = self._connection().execute(
+            "SELECT fetched_at FROM fetches WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def write(self, ticker, df, replace=False):
+        df = _normalise(df)
+        rows = [
+            (ticker, date.strftime("%Y-%m-%d"), *(float(bar[c]) for c in COLUMNS))
+            for date, bar in zip(df.index, df[COLUMNS].to_dict("records"))
+        ]
+        conn = self._connection()
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO fetches VALUES (?, ?)", (ticker, time.time())
+            )
+        return len(rows)
+
+    def _stored_close(self, ticker, date):
+        row = self._connection().execute(
+            "SELECT close FROM prices WHERE ticker = ? AND date = ?", (ticker, date)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _fresh(self, ticker):
+        fetched_at = self.last_fetched(ticker)
+        return fetched_at is not None and time.time() - fetched_at < self.refresh_seconds
+
+    def _write_tail(self, ticker, last_date, df):
+        # The tail starts at the last stored bar: it may have been intraday and
+        # it tells us whether the history has been re-adjusted since
+        stored = self._stored_close(ticker, last_date)
+        first = df.index[0].strftime("%Y-%m-%d")
+        if stored and first == last_date:
+            fetched = float(df["Close"].iloc[0])
+            if abs(fetched - stored) / abs(stored) > ADJUSTMENT_TOLERANCE:
+                print(f"History for {ticker} was re-adjusted, reloading...")
+                return self.write(ticker, download(ticker, period="max"), replace=True)
+        return self.write(ticker, df)
+
+    def update(self, ticker, force=False):
+        """Fetch whatever is missing for ``ticker``; returns the rows written."""
+        with self._ticker_lock(ticker):
+            if not force and self._fresh(ticker):
+                return 0
+
+            last_date = self.last_date(ticker)
+            if last_date is None:
+                print(f"Downloading full history for {ticker}...")
+                return self.write(ticker, download(ticker, period="max"), replace=True)
+
+            # No new bars yet is not an error
+            df = _normalise(download(ticker, raise_errors=False, start=last_date))
+            if df.empty:
+                return 0
+            return self._write_tail(ticker, last_date, df)
+
+    def update_many(self, tickers, force=False):
+        """update() for several tickers, with one multi-ticker download for
+        the full histories and one for the tails instead of a call each.
+
+        Tickers missing from a bulk download are retried through update(),
+        which raises the real error. Returns {ticker: exception} for those
+        that still failed.
+        """
+        stale = [t for t in tickers if force or not self._fresh(t)]
+        last_dates = {t: self.last_date(t) for t in stale}
+        new = [t for t in stale if last_dates[t] is None]
+        tails = [t for t in stale if last_dates[t] is not None]
+
+        retry = []
+        if new:
+            print(f"Downloading full history for {len(new)} tickers...")
+            frames = download_many(new, period="max")
+            for ticker in new:
+                if ticker not in frames:
+                    retry.append(ticker)
+                    continue
+                with self._ticker_lock(ticker):
+                    self.write(ticker, frames[ticker], replace=True)
+        if tails:
+            frames = download_many(tails, start=min(last_dates[t] for t in tails))
+            for ticker in tails:
+                bars = frames.get(ticker)
+                if bars is not None:
+                    bars = bars[bars.index >= pd.Timestamp(last_dates[ticker])]
+                if bars is None or bars.empty:
+                    retry.append(ticker)
+                    continue
+                with self._ticker_lock(ticker):
+                    self._write_tail(ticker, last_dates[ticker], bars)
+
+        errors = {}
+        for ticker in retry:
+            try:
+                self.update(ticker, force=True)
+            except Exception as e:
+                errors[ticker] = e
+        return errors
+
+    def read(self, ticker, start=None, end=None):
+        """Stored bars in [start, end), indexed by date like ``yf.download``."""
+        query = "SELECT date, open, high, low, close, volume FROM prices WHERE ticker = ?"
+        params = [ticker]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            query += " AND date < ?"
+            params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+        query += " ORDER BY date"
+        rows = self._connection().execute(query, params).fetchall()
+        df = pd.DataFrame(rows, columns=["Date"] + COLUMNS)
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df.set_index("Date")
+
+    def get_history(self, ticker, start=None, end=None, refresh=True):
+        if refresh:
+            try:
+                self.update(ticker)
+            except Exception as e:
+                # Serve what is on disk rather than failing the caller
+                print(f"Could not update price history for {ticker}: {e}")
+        return self.read(ticker, start, end)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    # Shared store for the process, opened on first use
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
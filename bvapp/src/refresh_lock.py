@@ -0,0 +1,41 @@
+"""Which process refreshes a shared cache file.
+
+Every prefork worker starts the background refreshes, but only the one
+holding a cache's lock scrapes and writes it; the others reload the file
+when it changes. The lock is an flock on "<cache>.lock", so it is released
+when its holder exits and another worker takes over.
+"""
+import fcntl
+import os
+
+
+class RefreshLock:
+    def __init__(self, cache_path):
+        self.path = f"{cache_path}.lock" if cache_path else None
+        self._file = None
+
+    def acquire(self):
+        """True if this process holds the lock (now or already); never waits."""
+        if self.path is None:
+            # No shared file, so nothing to coordinate
+            return True
+        if self._file is not None:
+            return True
+        file = open(self.path, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._file = file
+        return True
+
+
+def file_version(path):
+    """Identifies one write of a file that is only ever replaced, never
+    edited: each os.replace() gives it a new inode. None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance as yf
+
+from refresh_lock import RefreshLock, file_version
+
+
+REFRESH_SECONDS = float(os.environ.get("BV_FUNDAMENTALS_REFRESH_SECONDS", 6 * 60 * 60))
+FETCH_WORKERS = int(os.environ.get("BV_FUNDAMENTALS_WORKERS", 8))
+CACHE_PATH = os.environ.get("BV_FUNDAMENTALS_CACHE", "sector_fundamentals.json")
+
+
+def build_sector_index(constituents):
+    """Map each GICS sector to its [(ticker, company name), ...] in file order."""
+    index = {}
+    for ticker, row in constituents.items():
+        index.setdefault(row["GICS Sector"], []).append((ticker, row["Security"]))
+    return index
+
+
+def fetch_fundamentals(ticker):
+    info = yf.Ticker(ticker).info
+    return {"trailingPE": info.get("trailingPE"), "marketCap": info.get("marketCap")}
+
+
+class SectorFundamentals:
+    """Peer P/E and market cap for every constituent, refreshed in the background.
+
+    The table is replaced as a whole on each refresh, so readers always see
+    one consistent version without taking a lock. Of the processes sharing
+    cache_path, only the one holding its refresh lock runs the full
+    refresh; the others reload the file it writes.
+    """
+
+    def __init__(self, constituents, refresh_seconds=REFRESH_SECONDS,
+                 workers=FETCH_WORKERS, cache_path=CACHE_PATH):
+        self.sector_index = build_sector_index(constituents)
+        self.refresh_seconds = refresh_seconds
+        self.workers = workers
+        self.cache_path = cache_path
+        self.refreshed_at = None
+        self._table = {}
+        self._swap_lock = threading.Lock()
+        self._thread = None
+        self._refresh_lock = RefreshLock(cache_path)
+        self._version = None
+        self._load_cache()
+
+    def set_constituents(self, constituents):
+        # Swapped whole, like the table; companies that left the index just
+        # stop being listed as peers
+        self.sector_index = build_sector_index(constituents)
+
+    def _load_cache(self):
+        # Start warm after a restart; the background refresh replaces it
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            version = file_version(self.cache_path)
+            with open(self.cache_path, "r") as file:
+                cached = json.load(file)
+            self._table = cached["table"]
+            self.refreshed_at = cached["refreshed_at"]
+            self._version = version
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable fundamentals cache: {e}")
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"table": self._table, "refreshed_at": self.refreshed_at}, file)
+        os.replace(tmp_path, self.cache_path)
+        self._version = file_version(self.cache_path)
+
+    def reload(self):
+        """Pick up a cache file written by another process, if there is one."""
+        with self._swap_lock:
+            if file_version(self.cache_path) != self._version:
+                self._load_cache()
+
+    def fetch(self, tickers):
+        def fetch_one(ticker):
+            try:
+                return ticker, fetch_fundamentals(ticker)
+            except Exception as e:
+                print(f"Error fetching data for {ticker}: {e}")
+                return ticker, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            fetched = executor.map(fetch_one, tickers)
+            return {ticker: row for ticker, row in fetched if row is not None}
+
+    def refresh(self, tickers=None):
+        # Fetch outside the lock so a sector refresh never waits behind a full
+        # one. Companies that failed to fetch keep their previous row.
+        full = tickers is None
+        if full:
+            tickers = [t for peers in self.sector_index.values() for t, _ in peers]
+        fetched = self.fetch(tickers)
+        with self._swap_lock:
+            self._table = {**self._table, **fetched}
+            if full:
+                self.refreshed_at = time.time()
+            # Only the lock holder writes the shared file; elsewhere a (cold
+            # start) sector refresh stays in this process's memory
+            if self._refresh_lock.acquire():
+                self._save_cache()
+
+    def _run(self):
+        while True:
+            if not self._refresh_lock.acquire():
+                self.reload()
+                time.sleep(min(self.refresh_seconds, 60))
+                continue
+
+            if self.refreshed_at is None or time.time() - self.refreshed_at >= self.refresh_seconds:
+                started = time.monotonic()
+                try:
+                    self.refresh()
+                    print(f"Refreshed fundamentals for {len(self._table)} companies "
+                          f"in {time.monotonic() - started:.1f}s")
+                except Exception as e:
+                    print(f"Fundamentals refresh failed: {e}")
+            time.sleep(min(self.refresh_seconds, 60))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="fundamentals", daemon=True)
+            self._thread.start()
+
+    def peers(self, sector):
+        """[(ticker, name, trailing P/E, market cap)] for the sector's companies with data."""
+        companies = self.sector_index.get(sector, [])
+        if not any(ticker in self._table for ticker, _ in companies):
+            # Cold start: fetch just this sector rather than wait for the full refresh
+            self.refresh([ticker for ticker, _ in companies])
+
+        table = self._table
+        rows = []
+        for ticker, name in companies:
+            row = table.get(ticker)
+            if row and row.get("trailingPE") and row.get("marketCap"):
+                rows.append((ticker, name, row["trailingPE"], row["marketCap"]))
+        return rows
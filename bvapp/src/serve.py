@@ -0,0 +1,174 @@
+"""Production server: preload once, then fork workers that share the pages.
+
+The parent imports the app, reads the reference data (constituents, ticker
+and sector indexes, fundamentals cache) and loads the NumPy LSTM before
+forking, so every worker starts with them already in memory and shares
+those pages copy-on-write instead of loading its own copy:
+
+    python serve.py --workers 4 --port 5000
+
+Workers serve one shared listening socket and are restarted if they die.
+Forecast jobs (forecast_mode=async, /api/forecast-jobs) are queued in SQLite
+by any worker and run by one dispatcher process with the only forecast pool.
+Linux only (fork and /proc/<pid>/smaps_rollup).
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# The model is loaded synchronously below, before forking, rather than on
+# the app's warm-up thread (threads don't survive a fork)
+os.environ.setdefault("BV_MODEL_WARMUP", "0")
+# Web workers only queue forecast jobs; the dispatcher process runs them
+os.environ.setdefault("BV_FORECAST_DISPATCH", "0")
+
+
+def preload():
+    started = time.perf_counter()
+    import app
+
+    # Builder dependencies that app.py imports lazily; importing them here
+    # puts their modules in the shared pages too
+    for module in ("plotly.graph_objects", "plotly.io", "plotly.subplots", "statsmodels.api"):
+        try:
+            __import__(module)
+        except ImportError as e:
+            print(f"Not preloading {module}: {e}")
+
+    if app.LSTM_RUNTIME == "numpy":
+        app.load_prediction_model()
+        if app.model_state["error"] is not None:
+            print(f"Serving without the prediction model: {app.model_state['error']}")
+    else:
+        # TensorFlow / JAX runtimes start their own threads, which don't
+        # survive a fork, so each worker loads the Keras model itself
+        print(f"BV_LSTM_RUNTIME={app.LSTM_RUNTIME}: the model is loaded per worker")
+
+    print(f"Preloaded app in {time.perf_counter() - started:.1f}s")
+    return app
+
+
+def memory_usage(pid):
+    """(RSS, PSS) in KiB of a process. PSS splits shared pages between the
+    processes sharing them, so the PSS of the workers adds up to what they
+    really use."""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            fields = line.split()
+            if fields[0] in ("Rss:", "Pss:"):
+                usage[fields[0][:-1]] = int(fields[1])
+    return usage.get("Rss", 0), usage.get("Pss", 0)
+
+
+def report_memory(parent_pid, workers):
+    rows = [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in enumerate(workers)]
+    print(f"{'process':<12}{'pid':>8}{'RSS':>12}{'PSS':>12}")
+    total_pss = 0
+    for label, pid in rows:
+        try:
+            rss, pss = memory_usage(pid)
+        except OSError:
+            continue
+        total_pss += pss
+        print(f"{label:<12}{pid:>8}{rss / 1024:>10.1f}MB{pss / 1024:>10.1f}MB")
+    print(f"{'total':<20}{'':>12}{total_pss / 1024:>10.1f}MB")
+
+
+def run_worker(app_module, listener, host, port):
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    gc.enable()
+    server = make_server(host, port, app_module.app, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+
+def run_dispatcher(app_module, listener):
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    listener.close()
+    gc.enable()
+    app_module.forecast_jobs.run()
+
+
+def spawn(target, *args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            target(*args)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=1024)
+    parser.add_argument("--memory-report-seconds", type=float, default=300,
+                        help="how often to log per-worker RSS / PSS (0 to only log at startup)")
+    args = parser.parse_args()
+
+    # No collections while preloading, then freeze everything loaded so far:
+    # the collector never writes to those objects, so their pages stay shared
+    gc.disable()
+    app_module = preload()
+    gc.freeze()
+
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog)
+    worker_args = (run_worker, app_module, listener, args.host, args.port)
+    workers = [spawn(*worker_args) for _ in range(args.workers)]
+    dispatcher = spawn(run_dispatcher, app_module, listener)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers: {workers}; "
+          f"forecast dispatcher: {dispatcher}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Give the workers a moment to start before the first report
+    next_report = time.monotonic() + 2
+    while not stopping:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid in workers:
+            index = workers.index(pid)
+            print(f"Worker {index} ({pid}) exited with status {status}; restarting")
+            workers[index] = spawn(*worker_args)
+        elif pid == dispatcher:
+            print(f"Forecast dispatcher ({pid}) exited with status {status}; restarting")
+            dispatcher = spawn(run_dispatcher, app_module, listener)
+        if next_report is not None and time.monotonic() >= next_report:
+            report_memory(os.getpid(), workers)
+            interval = args.memory_report_seconds
+            next_report = time.monotonic() + interval if interval > 0 else None
+        time.sleep(0.5)
+
+    for pid in workers + [dispatcher]:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers + [dispatcher]:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    listener.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from price_store import get_store
+
+
+# Offsets used to cut the canonical daily history down to the periods the
+# frontend can ask for (see valid_time_periods in app.py)
+period_offsets = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+# Periods that are counted in trading days rather than calendar time
+period_rows = {
+    "1d": 1,
+    "5d": 5,
+}
+
+
+class TickerSnapshot:
+    """Request-scoped view of one ticker's Yahoo Finance data.
+
+    Each dataset (info, the three statements and the daily price history) is
+    fetched at most once, the first time it is read. Every section builder of
+    a request shares the same snapshot, so a page load costs one round-trip
+    per dataset instead of one per lookup. Safe to share between threads.
+    """
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self._company = yf.Ticker(ticker)
+        self._cache = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _load(self, name, loader):
+        # Sections run concurrently, so the first reader of a dataset fetches
+        # it while any other section asking for it waits instead of refetching
+        if name in self._cache:
+            return self._cache[name]
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._cache:
+                self._cache[name] = loader()
+        return self._cache[name]
+
+    @property
+    def info(self):
+        return self._load("info", lambda: self._company.info)
+
+    @property
+    def financials(self):
+        return self._load("financials", lambda: self._company.financials)
+
+    @property
+    def balance_sheet(self):
+        return self._load("balance_sheet", lambda: self._company.balance_sheet)
+
+    @property
+    def cashflow(self):
+        return self._load("cashflow", lambda: self._company.cashflow)
+
+    @property
+    def daily_history(self):
+        # One canonical daily history, served from the local price store;
+        # every period is a local slice of it
+        return self._load(
+            "daily_history", lambda: get_store().get_history(self.ticker)
+        )
+
+    @property
+    def as_of(self):
+        # Date of the latest daily bar; cached payloads are keyed on it
+        df = self.daily_history
+        return None if df.empty else df.index[-1].date().isoformat()
+
+    def history(self, period="max"):
+        df = self.daily_history
+        if df.empty or period == "max":
+            return df
+        if period in period_rows:
+            return df.iloc[-period_rows[period]:]
+        last_date = df.index[-1]
+        if period == "ytd":
+            start = last_date.replace(month=1, day=1, hour=0, minute=0, second=0)
+        else:
+            start = last_date - period_offsets[period]
+        return df[df.index >= start]
+
+    def history_between(self, start=None, end=None):
+        # Same semantics as yf.download(start=..., end=...): end is exclusive
+        df = self.daily_history
+        dates = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates < pd.Timestamp(end)
+        return df[mask]
+
+    def statement_value(self, statement, key):
+        # Most recent reported value of a statement line, or None if missing
+        df = getattr(self, statement)
+        if key in df.index:
+            return df.loc[key].iloc[0]
+        return None
@@ -0,0 +1,104 @@
+import bisect
+import difflib
+import os
+import re
+from functools import lru_cache
+
+import requests
+
+
+SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
+SEARCH_TIMEOUT = float(os.environ.get("BV_TICKER_SEARCH_TIMEOUT", 5))
+SEARCH_CACHE_SIZE = int(os.environ.get("BV_TICKER_SEARCH_CACHE_SIZE", 1024))
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+
+# Similarity a fuzzy match needs (difflib ratio) when Yahoo's search has no answer
+FUZZY_CUTOFF = 0.85
+# Shortest name prefix closest() tries; shorter ones are too often another company
+MIN_PREFIX_LENGTH = 5
+
+# Words that don't tell companies apart ("Apple Inc." is just "apple")
+legal_suffixes = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies",
+    "ltd", "limited", "plc", "group", "holdings", "the", "class", "a", "b", "c",
+}
+
+
+def normalize_name(name):
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    kept = [word for word in words if word not in legal_suffixes]
+    return " ".join(kept or words)
+
+
+def yahoo_symbol(symbol):
+    # Wikipedia writes share classes as BRK.B, Yahoo as BRK-B
+    return symbol.replace(".", "-")
+
+
+class TickerIndex:
+    """Resolves a symbol or company name to a Yahoo ticker without a network
+    call, for the companies in sp500_tickers.json.
+
+    resolve() only answers exact symbols and exact (normalized) names.
+    closest() is the fallback for when Yahoo's search finds nothing: a
+    whole-word name prefix that only one company has, then a close fuzzy
+    match. A prefix match alone would turn "Snap" into Snap-on, although
+    Snap Inc. isn't in the index.
+    """
+
+    def __init__(self, constituents):
+        self.symbols = {}
+        self.names = {}
+        for symbol, row in constituents.items():
+            ticker = yahoo_symbol(symbol)
+            self.symbols[symbol.upper()] = ticker
+            self.symbols[ticker.upper()] = ticker
+            self.names.setdefault(normalize_name(row["Security"]), ticker)
+        self.sorted_names = sorted(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, query):
+        if len(query) < MIN_PREFIX_LENGTH:
+            return None
+        start = bisect.bisect_left(self.sorted_names, query)
+        end = bisect.bisect_left(self.sorted_names, query + "\uffff")
+        # Whole words only: "general" matches "general motors", "gene" doesn't
+        tickers = {
+            self.names[name] for name in self.sorted_names[start:end]
+            if name == query or name.startswith(query + " ")
+        }
+        # Ambiguous prefixes ("american") are left to the later steps
+        return tickers.pop() if len(tickers) == 1 else None
+
+    def fuzzy(self, query):
+        matches = difflib.get_close_matches(query, self.sorted_names, n=1, cutoff=FUZZY_CUTOFF)
+        return self.names[matches[0]] if matches else None
+
+    def resolve(self, query):
+        query = query.strip()
+        if not query:
+            return None
+        return self.symbols.get(query.upper()) or self.names.get(normalize_name(query))
+
+    def closest(self, query):
+        name = normalize_name(query.strip())
+        if not name:
+            return None
+        return self.prefix(name) or self.fuzzy(name)
+
+
+@lru_cache(maxsize=SEARCH_CACHE_SIZE)
+def search_ticker(company_name):
+    """Yahoo Finance's best match for a name, or None if it has none.
+
+    Network errors are raised rather than returned, so they aren't cached.
+    """
+    params = {"q": company_name, "quotes_count": 1, "country": "United States"}
+    res = requests.get(
+        url=SEARCH_URL, params=params, headers={"User-Agent": USER_AGENT}, timeout=SEARCH_TIMEOUT
+    )
+    res.raise_for_status()
+    quotes = res.json().get("quotes") or []
+    return quotes[0]["symbol"] if quotes else None
@@ -0,0 +1,124 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+SHARD_DIR = os.environ.get("BV_LSTM_SHARD_DIR", "lstm_shards")
+
+
+def min_max_scale(prices):
+    # Same transform as sklearn's MinMaxScaler with the default (0, 1) range
+    prices = np.asarray(prices, dtype=np.float64)
+    low = prices.min(axis=0)
+    span = prices.max(axis=0) - low
+    span[span == 0] = 1
+    return (prices - low) / span
+
+
+def manifest_path(shard_dir):
+    return os.path.join(shard_dir, "manifest.json")
+
+
+def load_manifest(shard_dir):
+    try:
+        with open(manifest_path(shard_dir), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_shard(ticker, prices, shard_dir=SHARD_DIR):
+    """Scale one ticker's closes and save them as a float32 .npy shard.
+
+    Only the scaled series is stored; training windows are strided views
+    over the memory-mapped shard, so a shard costs 4 bytes per day no
+    matter the sequence length. Returns the number of rows written.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    scaled = min_max_scale(np.asarray(prices).reshape(-1, 1)).astype(np.float32)
+    path = os.path.join(shard_dir, f"{ticker}.npy")
+    tmp_path = os.path.join(shard_dir, f".{ticker}.tmp.npy")
+    np.save(tmp_path, scaled)
+    os.replace(tmp_path, path)
+    return len(scaled)
+
+
+class ShardedSequences:
+    """(window, next value) training batches drawn from memory-mapped shards.
+
+    The shards are the tickers the ingest manifest lists as complete
+    (optionally only those in `tickers`), so shards left behind by failed
+    or delisted tickers aren't trained on. Samples are shuffled across all
+    shards every epoch. Only the shards' pages that a batch touches are
+    read, so memory stays flat as the universe or the sequence length grows.
+    """
+
+    def __init__(self, shard_dir=SHARD_DIR, tickers=None, seq_length=60, batch_size=32,
+                 shuffle=True, seed=None, prefetch=8):
+        self.seq_length = seq_length
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self._rng = np.random.default_rng(seed)
+
+        manifest = load_manifest(shard_dir)
+        wanted = None if tickers is None else set(tickers)
+        self.tickers = sorted(
+            ticker for ticker, entry in manifest.items()
+            if entry.get("status") == "complete" and (wanted is None or ticker in wanted)
+        )
+        self.shards = [np.load(os.path.join(shard_dir, f"{t}.npy"), mmap_mode="r") for t in self.tickers]
+        counts = np.array([max(len(s) - seq_length, 0) for s in self.shards], dtype=np.int64)
+        # Sample i lives in shard searchsorted(starts, i) at offset i - start
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+        self.n_samples = int(self._starts[-1])
+
+    def __len__(self):
+        # Batches per epoch
+        return -(-self.n_samples // self.batch_size)
+
+    def _batch(self, sample_ids):
+        shard_ids = np.searchsorted(self._starts, sample_ids, side="right") - 1
+        offsets = sample_ids - self._starts[shard_ids]
+
+        X = np.empty((len(sample_ids), self.seq_length, 1), dtype=np.float32)
+        y = np.empty((len(sample_ids), 1), dtype=np.float32)
+        for j, (shard_id, offset) in enumerate(zip(shard_ids, offsets)):
+            shard = self.shards[shard_id]
+            X[j] = shard[offset:offset + self.seq_length]
+            y[j] = shard[offset + self.seq_length]
+        return X, y
+
+    def _epochs(self):
+        while True:
+            if self.shuffle:
+                order = self._rng.permutation(self.n_samples)
+            else:
+                order = np.arange(self.n_samples)
+            for start in range(0, self.n_samples, self.batch_size):
+                yield self._batch(order[start:start + self.batch_size])
+
+    def batches(self):
+        """Endless generator of batches for model.fit(steps_per_epoch=len(self)).
+
+        Batches are assembled on a background thread, up to `prefetch` ahead
+        of the training loop. An error there is raised here, in the loop.
+        """
+        ready = queue.Queue(maxsize=self.prefetch)
+
+        def produce():
+            try:
+                for batch in self._epochs():
+                    ready.put(batch)
+            except BaseException as e:
+                ready.put(e)
+
+        threading.Thread(target=produce, name="shard-prefetch", daemon=True).start()
+        while True:
+            batch = ready.get()
+            if isinstance(batch, BaseException):
+                raise batch
+            yield batch